@@ -0,0 +1,103 @@
+"""
+Shared helpers for the offline benchmarks: dummy settings so `src` can be
+imported without a .env, percentiles and result storage/comparison.
+"""
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+DUMMY_ENV = {
+    "GENAI_API_KEY": "bench",
+    "MONGO_URI": "mongodb://localhost:27017",
+    "DB_NAME": "bench",
+    "SECRET_KEY": "bench-secret-key-with-at-least-32-bytes",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "15",
+    "REFRESH_TOKEN_EXPIRE_DAYS": "7",
+    # Benchmarks measure the pipeline, not the limits in front of it
+    "RATE_LIMIT_DEFAULT": "1000000/minute",
+    "COST_QUOTA": "1000000000/hour",
+    "TRACE_EXPORTER": "none",
+    "LOG_LEVEL": "WARNING",
+}
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def setup_env():
+    for key, value in DUMMY_ENV.items():
+        os.environ.setdefault(key, value)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def latency_summary(seconds: list[float]) -> dict:
+    return {
+        "count": len(seconds),
+        "p50_ms": percentile(seconds, 50) * 1000,
+        "p95_ms": percentile(seconds, 95) * 1000,
+        "p99_ms": percentile(seconds, 99) * 1000,
+        "max_ms": (max(seconds) if seconds else 0.0) * 1000,
+    }
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def save_results(name: str, results: dict) -> str:
+    """Writes results to benchmarks/results/<name>-<timestamp>.json and <name>-latest.json."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results = {
+        "name": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        **results,
+    }
+
+    path = os.path.join(RESULTS_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    for target in (path, os.path.join(RESULTS_DIR, f"{name}-latest.json")):
+        with open(target, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return path
+
+
+def compare_results(current: dict, baseline_path: str, threshold: float = 0.10) -> list[str]:
+    """
+    Compares every numeric leaf whose key ends in _ms, _s or _per_sec
+    against a stored baseline and returns human-readable regressions.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+
+    def walk(cur, base, prefix=""):
+        for key, value in cur.items():
+            if key not in base:
+                continue
+            name = f"{prefix}{key}"
+            if isinstance(value, dict) and isinstance(base[key], dict):
+                walk(value, base[key], name + ".")
+            elif isinstance(value, (int, float)) and isinstance(base[key], (int, float)) and base[key]:
+                change = (value - base[key]) / base[key]
+                lower_is_better = key.endswith(("_ms", "_s", "_mb"))
+                worse = change > threshold if lower_is_better else (key.endswith("_per_sec") and change < -threshold)
+                if worse:
+                    regressions.append(f"{name}: {base[key]:.3f} -> {value:.3f} ({change:+.1%})")
+
+    walk(current, baseline)
+    return regressions
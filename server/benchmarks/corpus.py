@@ -0,0 +1,88 @@
+"""
+Synthetic PDF corpus for benchmarks.
+
+Each document has a repeating header/footer (exercising header/footer
+detection), page numbers and paragraphs of seeded pseudo-random prose.
+Every page also carries a unique "fact" sentence, which the load test
+uses to build questions with a known answer page.
+
+Usage (from server/):
+    python -m benchmarks.corpus --out /tmp/corpus --docs 20 --pages 30
+"""
+import argparse
+import os
+import random
+
+import fitz  # PyMuPDF
+
+WORDS = (
+    "policy coverage claim premium insurer member benefit deductible provider network "
+    "employee contract clause liability payment schedule renewal notice period amendment "
+    "document section annex procedure approval request manager report review audit "
+    "compliance risk data security access retention training incident response vendor"
+).split()
+
+
+def page_fact(doc_index: int, page_number: int) -> tuple[str, str]:
+    """The (question, fact sentence) planted on a page."""
+    code = f"K{doc_index:03d}P{page_number:03d}"
+    return (
+        f"What is the reference code for clause {page_number} of schedule {doc_index}?",
+        f"The reference code for clause {page_number} of schedule {doc_index} is {code}.",
+    )
+
+
+def paragraph(rng: random.Random, sentences: int = 5) -> str:
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+        out.append(" ".join(words).capitalize() + ".")
+    return " ".join(out)
+
+
+def make_pdf(doc_index: int, pages: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed * 100003 + doc_index)
+    doc = fitz.open()
+
+    for page_number in range(1, pages + 1):
+        page = doc.new_page()
+        width, height = page.rect.width, page.rect.height
+
+        page.insert_text((72, 40), f"ACME Corp - Benefits Handbook {doc_index}", fontsize=9)
+        page.insert_text((72, height - 30), "Confidential - internal use only", fontsize=9)
+        page.insert_text((width - 100, height - 30), str(page_number), fontsize=9)
+
+        _, fact = page_fact(doc_index, page_number)
+        body = "\n\n".join([paragraph(rng), fact, paragraph(rng), paragraph(rng)])
+        page.insert_textbox(fitz.Rect(72, 80, width - 72, height - 80), body, fontsize=10)
+
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def generate_corpus(out_dir: str, docs: int, pages: int, seed: int = 0) -> list[str]:
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(docs):
+        path = os.path.join(out_dir, f"doc_{i:04d}.pdf")
+        with open(path, "wb") as f:
+            f.write(make_pdf(i, pages, seed))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.out, args.docs, args.pages, args.seed)
+    print(f"Wrote {len(paths)} PDFs to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
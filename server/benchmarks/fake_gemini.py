@@ -0,0 +1,101 @@
+"""
+In-process stand-in for the google-genai client used by the pipeline.
+
+Implements models.embed_content / generate_content / count_tokens with
+configurable latency and error rate, returning deterministic bag-of-words
+embeddings so retrieval still behaves sensibly. No network access.
+"""
+import random
+import re
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+
+WORD_RE = re.compile(r"\w+")
+
+
+def _text_of(content) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, dict):
+        return " ".join(p.get("text", "") for p in content.get("parts", []))
+    parts = getattr(content, "parts", None) or []
+    return " ".join(getattr(p, "text", "") or "" for p in parts)
+
+
+def _as_list(contents):
+    return contents if isinstance(contents, list) else [contents]
+
+
+def fake_embedding(text: str, dim: int) -> list[float]:
+    vec = np.zeros(dim, dtype=np.float32)
+    for word in WORD_RE.findall(text.lower()):
+        vec[zlib.crc32(word.encode()) % dim] += 1.0
+    if not vec.any():
+        vec[0] = 1.0
+    return vec.tolist()
+
+
+class FakeGeminiError(Exception):
+    pass
+
+
+class FakeModels:
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 20.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {"embed_content": 0, "generate_content": 0, "count_tokens": 0}
+
+    def _simulate(self, call: str):
+        with self._lock:
+            self.calls[call] += 1
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.error_rate
+
+        time.sleep(delay)
+        if fail:
+            raise FakeGeminiError(f"simulated {call} failure")
+
+    def embed_content(self, model, contents, config=None):
+        self._simulate("embed_content")
+        dim = getattr(config, "output_dimensionality", None) or 768
+        return SimpleNamespace(embeddings=[
+            SimpleNamespace(values=fake_embedding(_text_of(c), dim)) for c in _as_list(contents)
+        ])
+
+    def generate_content(self, model, contents, config=None):
+        self._simulate("generate_content")
+        prompt = " ".join(_text_of(c) for c in _as_list(contents))
+        answer = "Based on the document: " + " ".join(WORD_RE.findall(prompt)[-40:])
+        return SimpleNamespace(
+            text=answer,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=len(prompt) // 4,
+                candidates_token_count=len(answer) // 4,
+            ),
+        )
+
+    def count_tokens(self, model, contents):
+        self._simulate("count_tokens")
+        text = " ".join(_text_of(c) for c in _as_list(contents))
+        return SimpleNamespace(total_tokens=len(text) // 4)
+
+
+class FakeClient:
+    def __init__(self, **kwargs):
+        self.models = FakeModels(**kwargs)
+
+
+def install_fake_gemini(**kwargs) -> FakeClient:
+    """Replaces the shared Gemini client of the provider layer with a fake."""
+    from src.providers import gemini
+
+    fake = FakeClient(**kwargs)
+    gemini.set_client(fake)
+    return fake
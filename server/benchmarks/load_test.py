@@ -0,0 +1,213 @@
+"""
+Offline load test of the real FastAPI app.
+
+Gemini is replaced by the in-process stub (benchmarks/fake_gemini.py),
+Chroma runs in a temporary directory and auth is bypassed with a fixed
+benchmark user, so no network, MongoDB or API key is needed. Uploads a
+synthetic corpus through POST /api/v1/upload/, then fires questions at
+POST /api/v1/query/ and reports throughput, p50/p95/p99 per endpoint and
+peak RSS. Results are saved under benchmarks/results/.
+
+With --vector-store http a standalone Chroma server (`chroma run`) is
+launched on a free local port, exercising VECTOR_STORE_MODE=http.
+
+Usage (from server/):
+    python -m benchmarks.load_test --docs 20 --pages 20 --queries 200 --concurrency 16
+    python -m benchmarks.load_test --vector-store http
+    python -m benchmarks.load_test --compare benchmarks/results/load_test-latest.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from types import SimpleNamespace
+
+from ._common import compare_results, latency_summary, peak_rss_mb, save_results, setup_env
+
+setup_env()
+
+BENCH_USER = SimpleNamespace(id="bench-user", email="bench@example.com", full_name="Bench")
+
+
+def launch_chroma_server(data_dir: str) -> tuple[subprocess.Popen, int]:
+    """Starts `chroma run` on a free port and waits until it answers."""
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    proc = subprocess.Popen(
+        ["chroma", "run", "--path", data_dir, "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/v2/heartbeat", timeout=1).raise_for_status()
+            return proc, port
+        except httpx.HTTPError:
+            time.sleep(0.25)
+
+    proc.terminate()
+    raise RuntimeError("Chroma server did not start within 60s.")
+
+
+def build_app(chroma_dir: str, latency_ms: float, jitter_ms: float, error_rate: float):
+    # Settings are read when src is first imported
+    os.environ["VECTOR_STORE_PATH"] = chroma_dir
+
+    from .fake_gemini import install_fake_gemini
+    from src.app import app
+    from src.core.security import get_current_user
+    from src.database.connection import create_chroma_client
+
+    fake = install_fake_gemini(latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate)
+
+    async def bench_user():
+        return BENCH_USER
+
+    app.dependency_overrides[get_current_user] = bench_user
+    # Skip the MongoDB lifespan; only the vector store is needed
+    app.chroma_client = create_chroma_client()
+    return app, fake
+
+
+async def run_phase(name: str, jobs: list, concurrency: int, send):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], {}
+
+    async def one(job):
+        async with semaphore:
+            start = time.perf_counter()
+            status, body = await send(job)
+            elapsed = time.perf_counter() - start
+            if status == 200:
+                latencies.append(elapsed)
+            else:
+                errors[status] = errors.get(status, 0) + 1
+            return body if status == 200 else None
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(j) for j in jobs))
+    wall = time.perf_counter() - start
+
+    summary = {
+        "requests": len(jobs),
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_s": wall,
+        "requests_per_sec": len(latencies) / wall if wall else 0.0,
+        **latency_summary(latencies),
+    }
+    print(
+        f"{name:>7}: {summary['requests_per_sec']:7.1f} req/s  "
+        f"p50={summary['p50_ms']:.0f}ms p95={summary['p95_ms']:.0f}ms p99={summary['p99_ms']:.0f}ms  "
+        f"errors={errors or 0}"
+    )
+    return summary, results
+
+
+async def run(args):
+    import httpx
+
+    from .corpus import make_pdf, page_fact
+
+    chroma_dir = tempfile.mkdtemp(prefix="bench-chroma-")
+    server = None
+    try:
+        if args.vector_store == "http":
+            server, port = launch_chroma_server(chroma_dir)
+            os.environ["CHROMA_HOST"], os.environ["CHROMA_PORT"] = "127.0.0.1", str(port)
+
+        app, fake = build_app(chroma_dir, args.latency_ms, args.jitter_ms, args.error_rate)
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            pdfs = [(i, make_pdf(i, args.pages, args.seed)) for i in range(args.docs)]
+
+            async def upload(job):
+                i, data = job
+                r = await client.post(
+                    "/api/v1/upload/",
+                    files={"file": (f"doc_{i}.pdf", data, "application/pdf")},
+                )
+                return r.status_code, (i, r.json() if r.status_code == 200 else None)
+
+            upload_summary, uploaded = await run_phase("upload", pdfs, args.concurrency, upload)
+            file_ids = {doc: body["file_id"] for doc, body in (u for u in uploaded if u) if body}
+
+            rng = random.Random(args.seed)
+            questions = []
+            for _ in range(args.queries if file_ids else 0):
+                doc = rng.choice(list(file_ids))
+                page = rng.randint(1, args.pages)
+                questions.append((doc, page, page_fact(doc, page)[0]))
+
+            async def query(job):
+                doc, page, question = job
+                r = await client.post(
+                    "/api/v1/query/",
+                    json={"file_id": file_ids[doc], "question": question, "top_k": args.top_k},
+                )
+                return r.status_code, (page, r.json() if r.status_code == 200 else None)
+
+            query_summary, answered = await run_phase("query", questions, args.concurrency, query)
+
+            hits = sum(
+                1 for res in answered
+                if res and res[1] and any(m.get("page_number") == res[0] for m in res[1]["metadatas_used"])
+            )
+            query_summary["recall_at_k"] = hits / len(questions) if questions else 0.0
+
+        results = {
+            "config": vars(args),
+            "upload": upload_summary,
+            "query": query_summary,
+            "gemini_calls": dict(fake.models.calls),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        print(f"recall@{args.top_k}={query_summary['recall_at_k']:.2f}  peak RSS={results['peak_rss_mb']:.0f}MB  gemini calls={results['gemini_calls']}")
+        return results
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        shutil.rmtree(chroma_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mean fake Gemini latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake Gemini calls that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vector-store", choices=["persistent", "http"], default="persistent")
+    parser.add_argument("--name", default="load_test", help="results file prefix")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args()
+    os.environ["VECTOR_STORE_MODE"] = args.vector_store
+
+    results = asyncio.run(run(args))
+    # Compare before saving: saving overwrites <name>-latest.json
+    if args.compare:
+        regressions = compare_results(results, args.compare)
+        print("\n".join(["REGRESSIONS:", *regressions]) if regressions else "no regressions vs baseline")
+
+    print(f"saved {save_results(args.name, results)}")
+
+
+if __name__ == "__main__":
+    main()
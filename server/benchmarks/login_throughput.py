@@ -0,0 +1,93 @@
+"""
+Login throughput benchmark.
+
+Simulates a login storm (N concurrent password verifications) while a
+"query" task ticks on the same event loop, and compares:
+  - sync:  verify_hash called inline in the coroutine (old behaviour)
+  - async: verify_hash_async through the bounded hash pool
+
+Reports logins/sec and event-loop lag seen by the concurrent query task.
+
+Usage (from server/):
+    python -m benchmarks.login_throughput --logins 64 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from ._common import percentile, setup_env
+
+setup_env()
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005):
+    """Stands in for query traffic: records how late each tick fires."""
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+    return lags
+
+
+async def run(mode: str, logins: int, password: str, stored_hash: str):
+    from src.utils.generate_hash import verify_hash, verify_hash_async
+
+    async def login_sync():
+        return verify_hash(password, stored_hash)
+
+    async def login_async():
+        return await verify_hash_async(password, stored_hash)
+
+    login = login_sync if mode == "sync" else login_async
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    lags = await lag_task
+    assert all(results)
+
+    return {
+        "mode": mode,
+        "logins": logins,
+        "seconds": elapsed,
+        "logins_per_sec": logins / elapsed,
+        "loop_lag_p99_ms": percentile(lags, 99) * 1000,
+        "loop_lag_max_ms": (max(lags) if lags else 0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None, help="PASSWORD_HASH_WORKERS override")
+    args = parser.parse_args()
+
+    if args.workers:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+
+    from src.utils.generate_hash import generate_hash, hash_pool_stats
+
+    password = "correct horse battery staple"
+    stored_hash = generate_hash(password)
+
+    for mode in ("sync", "async"):
+        r = asyncio.run(run(mode, args.logins, password, stored_hash))
+        print(
+            f"{r['mode']:>5}: {r['logins_per_sec']:8.1f} logins/s  "
+            f"({r['seconds']:.2f}s for {r['logins']})  "
+            f"loop lag p99={r['loop_lag_p99_ms']:.1f}ms max={r['loop_lag_max_ms']:.1f}ms"
+        )
+
+    print(f"hash pool: {hash_pool_stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Micro-benchmarks for the CPU-bound pipeline helpers:
+clean_md, chunk_with_token_safety (Gemini stubbed, zero latency) and
+normalize. Results are saved under benchmarks/results/.
+
+Usage (from server/):
+    python -m benchmarks.micro
+    python -m benchmarks.micro --compare benchmarks/results/micro-latest.json
+"""
+import argparse
+import random
+import statistics
+import timeit
+
+from ._common import compare_results, save_results, setup_env
+
+setup_env()
+
+
+def bench(func, number: int, repeat: int) -> dict:
+    times = [t / number for t in timeit.repeat(func, number=number, repeat=repeat)]
+    return {
+        "best_ms": min(times) * 1000,
+        "median_ms": statistics.median(times) * 1000,
+        "ops_per_sec": 1 / min(times),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50, help="pages of text per chunker run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args()
+
+    from .corpus import paragraph
+    from .fake_gemini import install_fake_gemini
+
+    install_fake_gemini(latency_ms=0, jitter_ms=0)
+
+    from src.utils.chunker import chunk_with_token_safety
+    from src.utils.cleaner import clean_md
+    from src.utils.normalize_vector import normalize
+
+    rng = random.Random(args.seed)
+
+    # Raw page text shaped like PyMuPDF output: hard wraps, hyphenation, page numbers
+    raw_page = "\n".join(
+        line
+        for _ in range(6)
+        for line in (paragraph(rng, 6).replace(" ", "\n", 1).replace("ment ", "ment-\n"), "", "12")
+    )
+    pages = [{"page_number": i + 1, "text": clean_md(raw_page)} for i in range(args.pages)]
+    vector = [rng.random() for _ in range(1536)]
+
+    results = {
+        "clean_md_page": bench(lambda: clean_md(raw_page), number=200, repeat=args.repeat),
+        "chunk_pages": bench(lambda: chunk_with_token_safety(pages), number=3, repeat=args.repeat),
+        "normalize_1536": bench(lambda: normalize(vector), number=2000, repeat=args.repeat),
+    }
+    results["chunk_pages"]["pages"] = args.pages
+
+    for name, r in results.items():
+        print(f"{name:>16}: best={r['best_ms']:.3f}ms median={r['median_ms']:.3f}ms ({r['ops_per_sec']:.0f} ops/s)")
+
+    # Compare before saving: saving overwrites micro-latest.json
+    if args.compare:
+        regressions = compare_results(results, args.compare)
+        print("\n".join(["REGRESSIONS:", *regressions]) if regressions else "no regressions vs baseline")
+
+    print(f"saved {save_results('micro', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Retrieval tuning harness: sweeps chunking (chunk size, overlap), top_k and
+HNSW parameters (M, construction_ef, search_ef) over a question dataset
+and reports, per setting, recall@k, MRR, query latency, index size and
+ingestion time. Exact-search rows also report how far answer chunks
+and unrelated chunks are from the question, to place
+RELEVANCE_MAX_DISTANCE. The best setting is written as settings overrides
+(CHUNK_SIZE, CHUNK_OVERLAP, HNSW_M, ...) to
+benchmarks/results/retrieval_tuning-recommended.env, ready for .env.
+
+Dataset: JSONL with one {"pdf": path, "question": str, "page": int} per
+line, where page is the 1-based page holding the answer. Without
+--dataset a synthetic corpus (benchmarks/corpus.py) is generated.
+
+Embeddings come from the stubbed bag-of-words Gemini by default, which is
+enough to exercise the harness and compare index parameters; pass
+--live to use the configured embedding provider (costs API calls).
+
+Each chunking setting is embedded once and re-indexed for every HNSW
+setting. Queries are filtered by file like production. Files small
+enough for the in-memory exact search (EMBEDDING_CACHE_MAX_CHUNKS)
+never hit HNSW, so an "exact" row is reported per chunking setting too.
+
+Usage (from server/):
+    python -m benchmarks.retrieval_tuning
+    python -m benchmarks.retrieval_tuning --dataset qa.jsonl --live --chunk-sizes 800,1200,1600
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from ._common import RESULTS_DIR, latency_summary, percentile, save_results, setup_env
+
+setup_env()
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def dir_size_mb(path: str) -> float:
+    total = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+    return total / (1024 * 1024)
+
+
+def synthetic_dataset(out_dir: str, docs: int, pages: int, seed: int) -> list[dict]:
+    from .corpus import generate_corpus, page_fact
+
+    paths = generate_corpus(out_dir, docs, pages, seed)
+    return [
+        {"pdf": path, "question": page_fact(doc, page)[0], "page": page}
+        for doc, path in enumerate(paths)
+        for page in range(1, pages + 1)
+    ]
+
+
+def rank_of_answer(metadatas: list[dict], page: int) -> int | None:
+    """1-based rank of the first retrieved chunk from the answer page."""
+    for rank, meta in enumerate(metadatas, start=1):
+        if meta["page_number"] == page:
+            return rank
+    return None
+
+
+def score(ranks: list, latencies: list[float], top_ks: list[int]) -> dict:
+    result = {
+        f"recall_at_{k}": sum(1 for r in ranks if r is not None and r <= k) / len(ranks)
+        for k in top_ks
+    }
+    result["mrr"] = sum(1 / r for r in ranks if r is not None) / len(ranks)
+    result["query"] = latency_summary(latencies)
+    return result
+
+
+def run(args) -> dict:
+    from .fake_gemini import install_fake_gemini
+
+    if not args.live:
+        install_fake_gemini(latency_ms=0, jitter_ms=0)
+
+    from src.providers import get_embedding_provider
+    from src.services.chroma_ops import hnsw_metadata
+    from src.services.embedding_cache import FileMatrix
+    from src.services.rag_service import chunk_metadatas, extract_pages
+    from src.utils.chunker import chunk_with_token_safety
+    from src.utils.embedder import embed_chunks, embed_queries
+
+    import chromadb
+
+    work_dir = tempfile.mkdtemp(prefix="retrieval-tuning-")
+    try:
+        if args.dataset:
+            with open(args.dataset) as f:
+                dataset = [json.loads(line) for line in f if line.strip()]
+        else:
+            dataset = synthetic_dataset(os.path.join(work_dir, "corpus"), args.docs, args.pages, args.seed)
+
+        pdfs = sorted({item["pdf"] for item in dataset})
+        file_ids = {pdf: f"file-{i}" for i, pdf in enumerate(pdfs)}
+        pages = {pdf: extract_pages(pdf) for pdf in pdfs}
+
+        # Question vectors do not depend on any swept parameter
+        query_vectors = embed_queries([item["question"] for item in dataset])
+        max_k = max(args.top_k)
+        limit = get_embedding_provider().max_input_tokens
+        max_tokens = min(args.max_tokens, limit) if limit else args.max_tokens
+
+        rows = []
+        for chunk_size, overlap in itertools.product(args.chunk_sizes, args.overlaps):
+            if overlap >= chunk_size:
+                continue
+
+            start = time.perf_counter()
+            chunks_by_file = {
+                pdf: chunk_with_token_safety(
+                    pages[pdf], model=get_embedding_provider().model_id, max_tokens=max_tokens,
+                    chunk_size=chunk_size, chunk_overlap=overlap,
+                )
+                for pdf in pdfs
+            }
+            texts, ids, metadatas = [], [], []
+            for pdf, chunks in chunks_by_file.items():
+                texts.extend(c["text"] for c in chunks)
+                ids.extend(c["chunk_id"] for c in chunks)
+                metadatas.extend(chunk_metadatas(file_ids[pdf], "tuning", pages[pdf], chunks))
+            embeddings = embed_chunks(texts)
+            embed_s = time.perf_counter() - start
+
+            setting = {"chunk_size": chunk_size, "chunk_overlap": overlap, "chunks": len(ids)}
+
+            # Exact search reference (what files under EMBEDDING_CACHE_MAX_CHUNKS get)
+            matrices, offset = {}, 0
+            for pdf, chunks in chunks_by_file.items():
+                end = offset + len(chunks)
+                matrices[pdf] = FileMatrix(ids[offset:end], embeddings[offset:end], texts[offset:end], metadatas[offset:end])
+                offset = end
+
+            # Distances of answer chunks vs. best matches in an unrelated file
+            # show where RELEVANCE_MAX_DISTANCE can cut without losing answers
+            ranks, latencies, answer_distances, unrelated_distances = [], [], [], []
+            for item, vector in zip(dataset, query_vectors):
+                t = time.perf_counter()
+                res = matrices[item["pdf"]].search([vector], max_k)
+                latencies.append(time.perf_counter() - t)
+                rank = rank_of_answer(res["metadatas"][0], item["page"])
+                ranks.append(rank)
+                if rank is not None:
+                    answer_distances.append(res["distances"][0][rank - 1])
+                if len(pdfs) > 1:
+                    other = pdfs[(pdfs.index(item["pdf"]) + 1) % len(pdfs)]
+                    unrelated_distances.append(matrices[other].search([vector], 1)["distances"][0][0])
+
+            rows.append({
+                **setting,
+                "search": "exact",
+                "ingest_s": embed_s,
+                "answer_distance_p95": percentile(answer_distances, 95),
+                "unrelated_distance_p5": percentile(unrelated_distances, 5) if unrelated_distances else None,
+                **score(ranks, latencies, args.top_k),
+            })
+
+            for m, construction_ef, search_ef in itertools.product(args.hnsw_m, args.construction_ef, args.search_ef):
+                store_dir = os.path.join(work_dir, f"store-{chunk_size}-{overlap}-{m}-{construction_ef}-{search_ef}")
+                client = chromadb.PersistentClient(path=store_dir)
+                collection = client.create_collection(
+                    name="tuning", metadata=hnsw_metadata(m, construction_ef, search_ef)
+                )
+
+                start = time.perf_counter()
+                batch = client.get_max_batch_size()
+                for i in range(0, len(ids), batch):
+                    collection.add(
+                        ids=ids[i:i + batch], embeddings=embeddings[i:i + batch],
+                        documents=texts[i:i + batch], metadatas=metadatas[i:i + batch],
+                    )
+                index_s = time.perf_counter() - start
+
+                ranks, latencies = [], []
+                for item, vector in zip(dataset, query_vectors):
+                    t = time.perf_counter()
+                    res = collection.query(
+                        query_embeddings=[vector],
+                        n_results=max_k,
+                        where={"$and": [{"file_id": file_ids[item["pdf"]]}, {"user_id": "tuning"}]},
+                    )
+                    latencies.append(time.perf_counter() - t)
+                    ranks.append(rank_of_answer(res["metadatas"][0], item["page"]))
+
+                rows.append({
+                    **setting,
+                    "search": "hnsw",
+                    "hnsw_m": m,
+                    "construction_ef": construction_ef,
+                    "search_ef": search_ef,
+                    "ingest_s": embed_s + index_s,
+                    "index_s": index_s,
+                    "index_size_mb": dir_size_mb(store_dir),
+                    **score(ranks, latencies, args.top_k),
+                })
+                del collection, client
+                shutil.rmtree(store_dir, ignore_errors=True)
+
+                r = rows[-1]
+                print(
+                    f"chunk={chunk_size:>5}/{overlap:<4} M={m:<3} ef_c={construction_ef:<4} ef_s={search_ef:<4} "
+                    + " ".join(f"R@{k}={r[f'recall_at_{k}']:.3f}" for k in args.top_k)
+                    + f" MRR={r['mrr']:.3f} p95={r['query']['p95_ms']:.1f}ms "
+                    f"index={r['index_size_mb']:.1f}MB ingest={r['ingest_s']:.1f}s"
+                )
+
+        return {"config": vars(args), "questions": len(dataset), "rows": rows}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def recommend(rows: list[dict], target_k: int, tolerance: float) -> dict:
+    """
+    Best HNSW setting: highest recall@target_k (ties within `tolerance`),
+    then highest MRR, then lowest p95 query latency, then smallest index.
+    """
+    candidates = [r for r in rows if r["search"] == "hnsw"]
+    best_recall = max(r[f"recall_at_{target_k}"] for r in candidates)
+    close = [r for r in candidates if r[f"recall_at_{target_k}"] >= best_recall - tolerance]
+    return min(close, key=lambda r: (-round(r["mrr"], 3), r["query"]["p95_ms"], r["index_size_mb"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", help="JSONL of {pdf, question, page}; synthetic corpus if omitted")
+    parser.add_argument("--docs", type=int, default=8, help="synthetic corpus size")
+    parser.add_argument("--pages", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--live", action="store_true", help="use the configured embedding provider")
+    parser.add_argument("--chunk-sizes", type=int_list, default=[800, 1200, 1600])
+    parser.add_argument("--overlaps", type=int_list, default=[100, 200])
+    parser.add_argument("--max-tokens", type=int, default=800)
+    parser.add_argument("--top-k", type=int_list, default=[3, 5, 8])
+    parser.add_argument("--hnsw-m", type=int_list, default=[16, 32])
+    parser.add_argument("--construction-ef", type=int_list, default=[100, 200])
+    parser.add_argument("--search-ef", type=int_list, default=[10, 50, 100])
+    parser.add_argument("--target-k", type=int, default=5, help="top_k the recommendation optimizes recall for")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="recall difference treated as a tie")
+    args = parser.parse_args()
+    if args.target_k not in args.top_k:
+        args.top_k = sorted(set(args.top_k) | {args.target_k})
+
+    results = run(args)
+    best = recommend(results["rows"], args.target_k, args.tolerance)
+    results["recommended"] = best
+
+    overrides = {
+        "CHUNK_SIZE": best["chunk_size"],
+        "CHUNK_OVERLAP": best["chunk_overlap"],
+        "CHUNK_MAX_TOKENS": args.max_tokens,
+        "HNSW_M": best["hnsw_m"],
+        "HNSW_CONSTRUCTION_EF": best["construction_ef"],
+        "HNSW_SEARCH_EF": best["search_ef"],
+    }
+
+    # A relevance cutoff only pays off when answers and unrelated matches separate
+    exact = next(
+        r for r in results["rows"]
+        if r["search"] == "exact" and (r["chunk_size"], r["chunk_overlap"]) == (best["chunk_size"], best["chunk_overlap"])
+    )
+    print(
+        f"answer chunk distance p95={exact['answer_distance_p95']:.3f}, "
+        f"best unrelated match p5={exact['unrelated_distance_p5'] or float('nan'):.3f}"
+    )
+    if exact["unrelated_distance_p5"] is not None and exact["answer_distance_p95"] < exact["unrelated_distance_p5"]:
+        overrides["RELEVANCE_MAX_DISTANCE"] = round(
+            (exact["answer_distance_p95"] + exact["unrelated_distance_p5"]) / 2, 3
+        )
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    env_path = os.path.join(RESULTS_DIR, "retrieval_tuning-recommended.env")
+    with open(env_path, "w") as f:
+        f.write(
+            f"# benchmarks/retrieval_tuning.py, {results['questions']} questions, "
+            f"recall@{args.target_k}={best[f'recall_at_{args.target_k}']:.3f} MRR={best['mrr']:.3f}\n"
+            "# HNSW_M / HNSW_CONSTRUCTION_EF apply to newly created collections only;\n"
+            "# HNSW_SEARCH_EF is also applied to the existing collection when it is opened\n"
+        )
+        f.writelines(f"{key}={value}\n" for key, value in overrides.items())
+
+    print(f"recommended: {overrides}")
+    print(f"saved {save_results('retrieval_tuning', results)} and {env_path}")
+
+
+if __name__ == "__main__":
+    main()
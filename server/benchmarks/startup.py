@@ -0,0 +1,185 @@
+"""
+Cold start benchmark.
+
+Import time: runs `python -X importtime -c "import src.app"` in fresh
+interpreters and reports the cumulative import time of src.app plus the
+slowest top-level imports.
+
+Time to first 200: starts the app under uvicorn in a subprocess (MongoDB
+skipped, vector store in a temporary directory, Gemini stubbed after the
+warm-up) and measures, from process start, the first 200 on GET / and the
+first 200 on a PDF upload, which needs the warmed-up vector store and the
+lazily imported PDF/chunking modules. Results are saved under
+benchmarks/results/.
+
+Usage (from server/):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --compare benchmarks/results/startup-latest.json
+"""
+import argparse
+import asyncio
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+from ._common import compare_results, save_results, setup_env
+
+setup_env()
+
+IMPORT_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import_time(runs: int, top: int) -> dict:
+    """Cumulative import time of src.app, best of `runs` fresh interpreters."""
+    totals, wall, slowest = [], [], {}
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import src.app"],
+            capture_output=True, text=True, check=True,
+        )
+        wall.append(time.perf_counter() - start)
+
+        run = {}
+        for match in IMPORT_LINE_RE.finditer(proc.stderr):
+            _, cumulative, indent, module = match.groups()
+            run[module] = (int(cumulative), len(indent))
+        totals.append(run["src.app"][0] / 1e6)
+
+        # Modules imported directly by src.app (one level below it)
+        for module, (cumulative, indent) in run.items():
+            if indent == 3:
+                slowest[module] = min(slowest.get(module, cumulative), cumulative)
+
+    top_modules = sorted(slowest.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        "import_src_app_s": min(totals),
+        "import_src_app_median_s": statistics.median(totals),
+        "interpreter_wall_s": min(wall),
+        "slowest_imports_ms": {module: us / 1000 for module, us in top_modules},
+    }
+
+
+def serve_app():
+    """
+    uvicorn factory: the real app with a lifespan that skips MongoDB but
+    runs the normal vector store / Gemini warm-up, then stubs Gemini.
+    """
+    from types import SimpleNamespace
+
+    from .fake_gemini import install_fake_gemini
+    from src.app import app
+    from src.core.security import get_current_user
+    from src.database.connection import _warm_up
+
+    @asynccontextmanager
+    async def bench_lifespan(app):
+        async def warm_up():
+            await _warm_up(app)
+            install_fake_gemini(latency_ms=0, jitter_ms=0)
+
+        app.chroma_client = None
+        app.warm_up = asyncio.create_task(warm_up())
+        yield
+        await app.warm_up
+
+    async def bench_user():
+        return SimpleNamespace(id="bench-user", email="bench@example.com", full_name="Bench")
+
+    app.router.lifespan_context = bench_lifespan
+    app.dependency_overrides[get_current_user] = bench_user
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_200(pdf: bytes, timeout: float) -> dict:
+    """Seconds from process start to the first 200 on / and on an upload."""
+    import httpx
+
+    chroma_dir = tempfile.mkdtemp(prefix="bench-startup-")
+    port = free_port()
+    env = {**os.environ, "VECTOR_STORE_PATH": chroma_dir, "VECTOR_STORE_MODE": "persistent"}
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.startup:serve_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    base = f"http://127.0.0.1:{port}"
+    result = {}
+    try:
+        deadline = start + timeout
+        while time.perf_counter() < deadline:
+            try:
+                if httpx.get(f"{base}/", timeout=1).status_code == 200:
+                    result["first_200_root_s"] = time.perf_counter() - start
+                    break
+            except httpx.TransportError:
+                time.sleep(0.01)
+        else:
+            raise RuntimeError(f"App did not answer within {timeout}s.")
+
+        r = httpx.post(
+            f"{base}/api/v1/upload/",
+            files={"file": ("startup.pdf", pdf, "application/pdf")},
+            timeout=timeout,
+        )
+        r.raise_for_status()
+        result["first_200_upload_s"] = time.perf_counter() - start
+        return result
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        shutil.rmtree(chroma_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters/servers per measurement")
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports to report")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args()
+
+    from .corpus import make_pdf
+
+    imports = measure_import_time(args.runs, args.top)
+    print(f"import src.app: best={imports['import_src_app_s'] * 1000:.0f}ms "
+          f"median={imports['import_src_app_median_s'] * 1000:.0f}ms "
+          f"(interpreter wall {imports['interpreter_wall_s'] * 1000:.0f}ms)")
+    for module, ms in imports["slowest_imports_ms"].items():
+        print(f"  {ms:8.1f}ms  {module}")
+
+    pdf = make_pdf(0, 2, 0)
+    runs = [measure_first_200(pdf, args.timeout) for _ in range(args.runs)]
+    serving = {key: min(r[key] for r in runs) for key in runs[0]}
+    print(f"first 200: GET / {serving['first_200_root_s'] * 1000:.0f}ms, "
+          f"upload {serving['first_200_upload_s'] * 1000:.0f}ms (best of {args.runs})")
+
+    results = {"imports": imports, "serving": serving}
+
+    # Compare before saving: saving overwrites startup-latest.json
+    if args.compare:
+        regressions = compare_results(results, args.compare)
+        print("\n".join(["REGRESSIONS:", *regressions]) if regressions else "no regressions vs baseline")
+
+    print(f"saved {save_results('startup', results)}")
+
+
+if __name__ == "__main__":
+    main()
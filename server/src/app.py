@@ -1,17 +1,38 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.middleware import SlowAPIMiddleware
 
-from src.routers import query, upload, user
-from .database.connection import lifespan_db
+from src.routers import files, query, upload, user
+from .database.connection import check_vector_store, lifespan_db
+from .rate_limiting import limiter
+from .metrics import render_metrics
+from .core.config import settings
+from .logging import configure_logging
+from .tracing import RequestTracingMiddleware, configure_tracing
 load_dotenv(".env")
 
+configure_logging(settings.LOG_LEVEL, json_logs=settings.LOG_JSON)
+configure_tracing()
+
 app = FastAPI(lifespan=lifespan_db)
 
 
 bearer_scheme = HTTPBearer()
 
+# Per-user request rate limits (keyed on the JWT subject)
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_middleware(SlowAPIMiddleware)
+
+# Request id + root span for every request
+app.add_middleware(RequestTracingMiddleware)
+
 # Add CORS
 app.add_middleware(
     CORSMiddleware,
@@ -24,7 +45,37 @@ app.add_middleware(
 app.include_router(upload.router, prefix="/api/v1")
 app.include_router(query.router, prefix="/api/v1")
 app.include_router(user.router, prefix="/api/v1")
+app.include_router(files.router, prefix="/api/v1")
 
 @app.get("/")
 async def root():
     return {"status": "server is running"}
+
+@app.get("/health")
+@limiter.exempt
+async def health(request: Request):
+    """Readiness check for load balancers: MongoDB ping + vector store heartbeat."""
+    checks = {"mongodb": False, "vector_store": False}
+
+    try:
+        await request.app.mongodb_db.command("ping")
+        checks["mongodb"] = True
+    except Exception:
+        pass
+
+    chroma = getattr(request.app, "chroma_client", None)
+    if chroma is not None:
+        checks["vector_store"] = await run_in_threadpool(check_vector_store, chroma)
+
+    healthy = all(checks.values())
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={"status": "ok" if healthy else "degraded", **checks}
+    )
+
+@app.get("/metrics", include_in_schema=False)
+@limiter.exempt
+async def metrics(request: Request):
+    """Prometheus scrape endpoint."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,306 @@
+"""
+Offline bulk ingestion of many PDFs for one user, without going through
+POST /upload/.
+
+PDFs are read from disk (a directory, searched recursively, or a manifest
+with one path per line). Extraction, cleaning and chunking run in a process
+pool. Chunks of many files are embedded together in full batches and
+written to Chroma in large adds. Progress is appended to a JSONL journal:
+re-running the same command skips files already done and cleans up
+files that were interrupted halfway.
+
+file_ids are derived from the user and the file content, so the same PDF
+always gets the same id. The journal records the file_id of each path.
+
+With VECTOR_STORE_MODE=persistent the API server must not be running
+against the same VECTOR_STORE_PATH; use a Chroma server (http mode) to
+ingest next to live traffic.
+
+Usage (from server/):
+    python -m src.bulk_ingest --user-id <id> ./customer_pdfs
+    python -m src.bulk_ingest --user-id <id> --manifest files.txt --workers 8
+"""
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from .core.config import settings
+from .logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+FILE_ID_NAMESPACE = uuid.UUID("6f1d3c52-8a4e-4b8f-9d0c-2f9f6b1e7a31")
+
+
+def file_id_for(user_id: str, pdf_path: str) -> str:
+    """Content-derived file id: same user + same bytes -> same id."""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return str(uuid.uuid5(FILE_ID_NAMESPACE, f"{user_id}:{digest.hexdigest()}"))
+
+
+def prepare_file(pdf_path: str, user_id: str) -> dict:
+    """
+    Process pool worker: extract, clean and chunk one PDF. Only chunks and
+    page fingerprints are sent back, not the page text.
+    """
+    from .services.rag_service import chunk_pages, extract_pages
+
+    try:
+        file_id = file_id_for(user_id, pdf_path)
+        pages = extract_pages(pdf_path)
+        chunks = chunk_pages(pages)
+    except Exception as e:
+        return {"path": pdf_path, "error": f"{type(e).__name__}: {e}"}
+
+    return {
+        "path": pdf_path,
+        "file_id": file_id,
+        "pages": [{"page_number": p["page_number"], "page_hash": p["page_hash"]} for p in pages],
+        "chunks": chunks,
+    }
+
+
+def find_pdfs(source: str | None, manifest: str | None) -> list[str]:
+    if manifest:
+        with open(manifest) as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(source)
+        for name in names
+        if name.lower().endswith(".pdf")
+    )
+
+
+class Journal:
+    """
+    Append-only JSONL progress log. The last record per path wins:
+    "storing" (chunks being written), "done" or "failed".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.by_path: dict[str, dict] = {}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.by_path[record["path"]] = record
+
+        self._file = open(path, "a")
+
+    def done_file_ids(self) -> set[str]:
+        return {r["file_id"] for r in self.by_path.values() if r["status"] == "done"}
+
+    def interrupted_file_ids(self) -> set[str]:
+        return {r["file_id"] for r in self.by_path.values() if r["status"] == "storing"}
+
+    def write(self, **record) -> None:
+        self.by_path[record["path"]] = record
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BulkIngester:
+    """Embeds and stores prepared files in large, cross-file batches."""
+
+    def __init__(self, user_id: str, chroma_client, journal: Journal, embed_workers: int, chroma_batch: int):
+        from .services.rag_service import RAG_PIPLINE
+
+        # Opens the collection and checks it matches the embedding model
+        RAG_PIPLINE(user_id, chroma_client)
+
+        self.user_id = user_id
+        self.chroma = chroma_client
+        self.journal = journal
+        self.chroma_batch = min(chroma_batch, chroma_client.get_max_batch_size())
+        self.embed_pool = ThreadPoolExecutor(max_workers=embed_workers, thread_name_prefix="bulk-embed")
+        self.done = journal.done_file_ids()
+        self.interrupted = journal.interrupted_file_ids()
+        self.stats = {"files": 0, "pages": 0, "chunks": 0, "embed_calls": 0, "skipped": 0, "failed": 0}
+
+    def store(self, prepared: list[dict]) -> None:
+        from .services.chroma_ops import delete_file_chunks
+
+        files, seen = [], set()
+        for item in prepared:
+            if item["file_id"] in self.done or item["file_id"] in seen:
+                # Same content already ingested under another path
+                self.journal.write(path=item["path"], file_id=item["file_id"], status="done", duplicate=True)
+                self.stats["skipped"] += 1
+                continue
+            if item["file_id"] in self.interrupted:
+                delete_file_chunks(item["file_id"], self.chroma, user_id=self.user_id)
+            seen.add(item["file_id"])
+            files.append(item)
+
+        if not files:
+            return
+
+        for item in files:
+            self.journal.write(path=item["path"], file_id=item["file_id"], status="storing")
+
+        try:
+            self._embed_and_add(files)
+        except Exception as e:
+            if len(files) == 1:
+                self._failed(files[0], e)
+                return
+            # Find the file(s) at fault: retry one by one (after removing
+            # what was already added), keep the rest
+            logger.warning("Storing %d files failed (%s), retrying them one by one.", len(files), e)
+            self.interrupted.update(item["file_id"] for item in files)
+            for item in files:
+                self.store([item])
+            return
+
+        for item in files:
+            self.journal.write(
+                path=item["path"], file_id=item["file_id"], status="done",
+                pages=len(item["pages"]), chunks=len(item["chunks"])
+            )
+            self.done.add(item["file_id"])
+            self.interrupted.discard(item["file_id"])
+            self.stats["files"] += 1
+            self.stats["pages"] += len(item["pages"])
+            self.stats["chunks"] += len(item["chunks"])
+
+    def _embed_and_add(self, files: list[dict]) -> None:
+        from .services.chroma_ops import add_embeddings
+        from .services.rag_service import chunk_metadatas
+        from .utils.embedder import BATCH_SIZE, embed_chunks
+
+        texts, ids, metadatas = [], [], []
+        for item in files:
+            texts.extend(c["text"] for c in item["chunks"])
+            ids.extend(c["chunk_id"] for c in item["chunks"])
+            metadatas.extend(chunk_metadatas(item["file_id"], self.user_id, item["pages"], item["chunks"]))
+
+        # Full batches from every file, embedded in parallel
+        slices = [texts[i : i + BATCH_SIZE] for i in range(0, len(texts), BATCH_SIZE)]
+        self.stats["embed_calls"] += len(slices)
+        embeddings = [v for vectors in self.embed_pool.map(embed_chunks, slices) for v in vectors]
+
+        for i in range(0, len(ids), self.chroma_batch):
+            end = i + self.chroma_batch
+            add_embeddings(self.chroma, texts[i:end], embeddings[i:end], ids[i:end], metadatas[i:end])
+
+    def _failed(self, item: dict, error: Exception) -> None:
+        """Removes whatever was stored of a file and journals it as failed."""
+        from .services.chroma_ops import delete_file_chunks
+
+        logger.warning("Failed to store %s: %s", item["path"], error)
+        try:
+            delete_file_chunks(item["file_id"], self.chroma, user_id=self.user_id)
+        except Exception as e:
+            # Left as "storing" in effect: the next run cleans it up
+            logger.warning("Could not clean up %s: %s", item["path"], e)
+            return
+
+        self.journal.write(
+            path=item["path"], file_id=item["file_id"], status="failed", error=f"{type(error).__name__}: {error}"
+        )
+        self.stats["failed"] += 1
+
+
+def run(args) -> dict:
+    from .database.connection import create_chroma_client
+
+    paths = find_pdfs(args.source, args.manifest)
+    journal = Journal(args.journal or f".bulk-ingest-{args.user_id}.jsonl")
+    todo = [p for p in paths if journal.by_path.get(p, {}).get("status") != "done"]
+    logger.info("%d PDFs found, %d already ingested.", len(paths), len(paths) - len(todo))
+
+    ingester = BulkIngester(args.user_id, create_chroma_client(), journal, args.embed_workers, args.chroma_batch)
+    ingester.stats["skipped"] += len(paths) - len(todo)
+
+    start = time.perf_counter()
+    buffer, buffered_chunks = [], 0
+    pending = set()
+    queue = iter(todo)
+
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Keep a bounded number of files in flight so memory stays flat
+        def refill():
+            while len(pending) < args.workers * 2:
+                path = next(queue, None)
+                if path is None:
+                    return
+                pending.add(pool.submit(prepare_file, path, args.user_id))
+
+        refill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            pending.difference_update(done)
+            refill()
+
+            for future in done:
+                item = future.result()
+                if "error" in item:
+                    logger.warning("Skipping %s: %s", item["path"], item["error"])
+                    journal.write(path=item["path"], status="failed", error=item["error"])
+                    ingester.stats["failed"] += 1
+                    continue
+
+                buffer.append(item)
+                buffered_chunks += len(item["chunks"])
+
+            if buffered_chunks >= args.flush_chunks:
+                ingester.store(buffer)
+                buffer, buffered_chunks = [], 0
+
+        ingester.store(buffer)
+
+    journal.close()
+    elapsed = time.perf_counter() - start
+    stats = ingester.stats
+    stats.update(
+        elapsed_s=elapsed,
+        docs_per_sec=stats["files"] / elapsed if elapsed else 0.0,
+        pages_per_sec=stats["pages"] / elapsed if elapsed else 0.0,
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", help="directory of PDFs (searched recursively)")
+    parser.add_argument("--manifest", help="file listing one PDF path per line")
+    parser.add_argument("--user-id", required=True, help="owner of the ingested files")
+    parser.add_argument("--journal", help="progress journal (default .bulk-ingest-<user-id>.jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="extract/chunk processes")
+    parser.add_argument("--embed-workers", type=int, default=4, help="concurrent embedding calls")
+    parser.add_argument("--flush-chunks", type=int, default=2000, help="chunks buffered before embedding/storing")
+    parser.add_argument("--chroma-batch", type=int, default=5000, help="max records per Chroma add")
+    args = parser.parse_args()
+
+    if not args.source and not args.manifest:
+        parser.error("give a directory or --manifest")
+
+    configure_logging(settings.LOG_LEVEL, json_logs=False)
+    stats = run(args)
+
+    print(
+        f"ingested {stats['files']} files ({stats['pages']} pages, {stats['chunks']} chunks) "
+        f"in {stats['elapsed_s']:.1f}s: {stats['docs_per_sec']:.2f} docs/s, {stats['pages_per_sec']:.1f} pages/s; "
+        f"{stats['skipped']} skipped, {stats['failed']} failed, {stats['embed_calls']} embedding calls"
+    )
+
+
+if __name__ == "__main__":
+    main()
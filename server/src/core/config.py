@@ -11,6 +11,113 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
 
+    # Vector store: "persistent" (embedded, dev) or "http" (standalone Chroma server)
+    VECTOR_STORE_MODE: str = "persistent"
+    VECTOR_STORE_PATH: str = "./vector_store"
+    CHROMA_HOST: str = "localhost"
+    CHROMA_PORT: int = 8000
+    CHROMA_SSL: bool = False
+    CHROMA_AUTH_TOKEN: str | None = None
+    CHROMA_MAX_CONNECTIONS: int = 64
+    CHROMA_KEEPALIVE_CONNECTIONS: int = 32
+    CHROMA_RETRIES: int = 3
+    CHROMA_RETRY_BACKOFF_SECONDS: float = 0.5
+
+    # HNSW index parameters (None = Chroma default). M and construction_ef
+    # only take effect when a collection is created; search_ef is also
+    # applied to the existing collection when it is opened
+    HNSW_M: int | None = None
+    HNSW_CONSTRUCTION_EF: int | None = None
+    HNSW_SEARCH_EF: int | None = None
+
+    # Retrieved chunks further than this cosine distance from the question,
+    # or this much further than the best match, are left out of the prompt;
+    # with none left the answer is "not found" without an LLM call
+    # (unset = always use all top_k chunks)
+    RELEVANCE_MAX_DISTANCE: float | None = None
+    RELEVANCE_MAX_GAP: float | None = None
+
+    # Chunking; benchmarks/retrieval_tuning.py measures alternatives
+    CHUNK_SIZE: int = 1200
+    CHUNK_OVERLAP: int = 200
+    CHUNK_MAX_TOKENS: int = 800         # capped at the embedding model's input limit
+
+    # Per-file embedding matrices kept in memory for exact search;
+    # files with more chunks than the limit go to the ANN index instead
+    EMBEDDING_CACHE_MAX_MB: int = 512
+    EMBEDDING_CACHE_MAX_CHUNKS: int = 2000
+    # Cached matrices are re-checked against the file's revision marker in
+    # Chroma after this long, so changes made by other workers or offline
+    # tools are picked up
+    EMBEDDING_CACHE_REVALIDATE_SECONDS: float = 5
+    EMBEDDING_CACHE_MAX_OVERSIZED: int = 10000
+
+    # Embedding / LLM backends
+    EMBEDDING_PROVIDER: str = "gemini"   # gemini | onnx
+    EMBEDDING_MODEL: str = "gemini-embedding-001"
+    EMBEDDING_DIMENSION: int = 1536
+    LOCAL_EMBEDDING_MODEL_DIR: str = "./models/all-MiniLM-L6-v2"
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 32
+    LOCAL_EMBEDDING_THREADS: int = 0     # 0 = all cores
+    LLM_PROVIDER: str = "gemini"
+    LLM_MODEL: str = "gemini-2.5-flash"
+    # Cheaper/faster tier for short contexts whose best chunk is a close
+    # match (unset = every answer uses LLM_MODEL)
+    LLM_MODEL_FAST: str | None = None
+    LLM_FAST_MAX_CONTEXT_TOKENS: int = 1500
+    LLM_FAST_MAX_DISTANCE: float = 0.3
+    GENAI_MAX_CONNECTIONS: int = 64
+    GENAI_KEEPALIVE_CONNECTIONS: int = 32
+    # Embedding requests from concurrent callers are coalesced for this long (0 = off)
+    EMBED_BATCH_WINDOW_MS: float = 5
+
+    # Resilience around embedding/LLM calls: deadlines, hedged embed calls,
+    # and a circuit breaker that serves cached answers while it is open
+    UPSTREAM_WORKERS: int = 64
+    UPSTREAM_EMBED_DEADLINE_SECONDS: float = 10
+    UPSTREAM_GENERATE_DEADLINE_SECONDS: float = 30
+    UPSTREAM_HEDGE_ENABLED: bool = True
+    UPSTREAM_HEDGE_PERCENTILE: float = 95
+    UPSTREAM_HEDGE_INITIAL_DELAY_SECONDS: float = 1.0
+    UPSTREAM_HEDGE_MIN_DELAY_SECONDS: float = 0.05
+    UPSTREAM_HEDGE_MAX_RATIO: float = 0.1
+    UPSTREAM_BREAKER_FAILURES: int = 5
+    UPSTREAM_BREAKER_RECOVERY_SECONDS: float = 30
+    ANSWER_CACHE_SIZE: int = 1024
+
+    # Password hashing (Argon2) runs off the event loop in a bounded pool
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # Per-user rate limits; use a shared storage (redis://...) with several workers
+    RATE_LIMIT_STORAGE_URI: str = "memory://"
+    RATE_LIMIT_DEFAULT: str = "120/minute"
+
+    # Cost quota per user, in units weighted by the work a request causes
+    COST_QUOTA: str = "20000/hour"
+    COST_PER_PAGE: float = 10
+    COST_PER_EMBED_CALL: float = 5
+    COST_PER_1K_TOKENS: float = 10
+
+    # Admission control: interactive queries have strict priority over ingestion
+    QUERY_CONCURRENCY: int = 8
+    QUERY_QUEUE_DEPTH: int = 64
+    QUERY_MAX_WAIT_SECONDS: float = 10
+    BATCH_CONCURRENCY: int = 8
+    BATCH_QUEUE_DEPTH: int = 256
+    BATCH_MAX_WAIT_SECONDS: float = 300
+    INGEST_CONCURRENCY: int = 2
+    INGEST_QUEUE_DEPTH: int = 8
+    INGEST_MAX_WAIT_SECONDS: float = 120
+
+    # Logging and tracing
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    SERVICE_NAME: str = "pdf-query-server"
+    TRACE_EXPORTER: str = "none"   # none | file | otlp (opt-in)
+    TRACE_FILE: str = "./traces/spans.jsonl"
+    TRACE_FILE_MAX_MB: int = 100
+    OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+
     model_config = SettingsConfigDict(env_file=".env")
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
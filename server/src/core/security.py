@@ -1,5 +1,6 @@
 # src/core/security.py
 
+import uuid
 from datetime import datetime, timedelta, timezone
 from jwt import encode, decode, PyJWTError
 from fastapi.security import HTTPAuthorizationCredentials, OAuth2PasswordBearer
@@ -9,7 +10,7 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from ..core.config import settings
 from ..models.document import User 
 from ..models.document import RefreshToken
-from ..utils.generate_hash import generate_hash
+from ..utils.generate_hash import hash_token
 
 security = HTTPBearer()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/user/login")
@@ -44,6 +45,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         user_id: str = payload.get("sub") 
         if user_id is None:
             raise credentials_exception
+
+        # Refresh tokens are only accepted by /user/refresh
+        if payload.get("type") == "refresh":
+            raise credentials_exception
             
     except PyJWTError:
         # Catches expired token, invalid signature, etc.
@@ -64,11 +69,15 @@ async def create_refresh_token(user: User) -> str:
         to_encode = {
             "sub": str(user.id),
             "exp": expire.timestamp(),
-            "iat": datetime.now(timezone.utc).timestamp()
+            "iat": datetime.now(timezone.utc).timestamp(),
+            # Unique per token so two logins in the same instant never collide
+            "jti": uuid.uuid4().hex,
+            "type": "refresh"
         }
 
         refresh_token = encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-        hash_refresh_token = generate_hash(refresh_token)
+        # JWTs are high-entropy, so a fast keyed digest is enough (no Argon2)
+        hash_refresh_token = hash_token(refresh_token)
 
         new_refresh_token = RefreshToken(
             token_hash=hash_refresh_token,
@@ -84,4 +93,51 @@ async def create_refresh_token(user: User) -> str:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not create refresh token",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+
+async def rotate_refresh_token(refresh_token: str) -> tuple[User, str]:
+    """
+    Exchanges a refresh token for a new one. The old token is claimed and
+    deleted in one indexed find-and-delete on token_hash; presenting a
+    valid but unknown token is treated as reuse and revokes every refresh
+    token of that user.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    try:
+        payload = decode(refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except PyJWTError:
+        raise credentials_exception
+
+    user_id = payload.get("sub")
+    if user_id is None or payload.get("type") != "refresh":
+        raise credentials_exception
+
+    # Atomic claim: of two concurrent refreshes with the same token only one
+    # gets the row, the other is treated as reuse
+    stored = await RefreshToken.get_pymongo_collection().find_one_and_delete(
+        {"token_hash": hash_token(refresh_token)}
+    )
+
+    if stored is None:
+        # Signed by us but already rotated away -> token reuse
+        user = await User.get(user_id)
+        if user is not None:
+            await RefreshToken.find(RefreshToken.user.id == user.id).delete()
+        raise credentials_exception
+
+    # Link fields are stored as DBRefs
+    if str(stored["user"].id) != user_id:
+        raise credentials_exception
+
+    user = await User.get(user_id)
+    if user is None:
+        raise credentials_exception
+
+    new_refresh_token = await create_refresh_token(user)
+
+    return user, new_refresh_token
@@ -1,53 +1,192 @@
+import asyncio
+import functools
+import logging
+import time
 from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
 from fastapi import FastAPI
 from pymongo import AsyncMongoClient
 from beanie import init_beanie 
-from chromadb import PersistentClient
 from fastapi import Request, HTTPException, status
-from chromadb.api import ClientAPI 
+
+if TYPE_CHECKING:
+    # chromadb takes most of the import time; it is loaded when the client is created
+    from chromadb.api import ClientAPI
 
 from ..core.config import settings
+from ..metrics import mark_worker_exited
 from ..models.document import User, RefreshToken
 
+logger = logging.getLogger(__name__)
+
 mongo_client: AsyncMongoClient = None
 chroma_client = None
 
+
+def _is_transient(e: Exception) -> bool:
+    """Connection-level failures worth retrying against a Chroma server."""
+    import httpx
+    return isinstance(e, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+# Run before each retry, e.g. to drop handles cached on a broken connection
+_retry_hooks: list = []
+
+
+def on_vector_store_retry(hook):
+    _retry_hooks.append(hook)
+    return hook
+
+
+def with_vector_store_retries(func):
+    """
+    Retries a vector-store call on transient connection errors with
+    exponential backoff. Embedded (persistent) mode never hits these.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(settings.CHROMA_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == settings.CHROMA_RETRIES or not _is_transient(e):
+                    raise
+                delay = settings.CHROMA_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+                logger.warning("Vector store call %s failed (%s), retrying in %.1fs", func.__name__, e, delay)
+                for hook in _retry_hooks:
+                    hook()
+                time.sleep(delay)
+    return wrapper
+
+
+@with_vector_store_retries
+def create_chroma_client() -> "ClientAPI":
+    """
+    Builds the vector store client selected by VECTOR_STORE_MODE:
+      - persistent: embedded store in VECTOR_STORE_PATH (single process only)
+      - http: client of a standalone Chroma server shared by every worker/pod,
+        over a pooled keep-alive HTTP connection
+    """
+    from chromadb import HttpClient, PersistentClient
+    from chromadb.config import Settings as ChromaSettings
+
+    if settings.VECTOR_STORE_MODE == "persistent":
+        return PersistentClient(path=settings.VECTOR_STORE_PATH)
+
+    if settings.VECTOR_STORE_MODE == "http":
+        headers = {"Authorization": f"Bearer {settings.CHROMA_AUTH_TOKEN}"} if settings.CHROMA_AUTH_TOKEN else None
+        client = HttpClient(
+            host=settings.CHROMA_HOST,
+            port=settings.CHROMA_PORT,
+            ssl=settings.CHROMA_SSL,
+            headers=headers,
+            settings=ChromaSettings(
+                anonymized_telemetry=False,
+                chroma_http_max_connections=settings.CHROMA_MAX_CONNECTIONS,
+                chroma_http_max_keepalive_connections=settings.CHROMA_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        client.heartbeat()
+        return client
+
+    raise ValueError(f"Unknown VECTOR_STORE_MODE: {settings.VECTOR_STORE_MODE}")
+
+
+def check_vector_store(client: "ClientAPI") -> bool:
+    """Health check: True when the vector store answers a heartbeat."""
+    try:
+        client.heartbeat()
+        return True
+    except Exception as e:
+        logger.warning("Vector store health check failed: %s", e)
+        return False
+
+def _uses_gemini() -> bool:
+    return "gemini" in (settings.EMBEDDING_PROVIDER, settings.LLM_PROVIDER)
+
+
+def _create_shared_genai_client():
+    from ..providers import gemini
+
+    client = gemini.create_genai_client()
+    gemini.set_client(client)
+    return client
+
+
+async def _warm_up(app: FastAPI):
+    """
+    Opens the vector store and the shared Gemini client in worker threads,
+    so their imports and connection setup overlap with MongoDB startup and
+    do not hold back the first requests. Routes that need the vector store
+    wait for this (see get_chroma_client_instance); /health reports it
+    as down until it is done.
+    """
+    async def open_chroma():
+        global chroma_client
+        chroma_client = await asyncio.to_thread(create_chroma_client)
+        app.chroma_client = chroma_client
+        logger.info("ChromaDB client initialized (%s mode).", settings.VECTOR_STORE_MODE)
+
+    async def open_genai():
+        if _uses_gemini():
+            app.genai_client = await asyncio.to_thread(_create_shared_genai_client)
+            logger.info("Gemini client initialized.")
+
+    results = await asyncio.gather(open_chroma(), open_genai(), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("Startup warm-up failed: %s", result)
+
+
 @asynccontextmanager
 async def lifespan_db(app: FastAPI):
     
+    app.chroma_client = None
+    app.genai_client = None
+    app.warm_up = asyncio.create_task(_warm_up(app))
+
     global mongo_client
-    mongo_client = AsyncMongoClient(settings.MONGO_URI)
+    try:
+        mongo_client = AsyncMongoClient(settings.MONGO_URI)
 
-    await init_beanie(
-        database=mongo_client[settings.DB_NAME],
-        document_models=[User, RefreshToken]
-    )
-    
-    app.mongodb_db = mongo_client[settings.DB_NAME]
-    print("🚀 MongoDB connection and Beanie initialization established.")
+        await init_beanie(
+            database=mongo_client[settings.DB_NAME],
+            document_models=[User, RefreshToken]
+        )
 
-    global chroma_client
+        app.mongodb_db = mongo_client[settings.DB_NAME]
+        logger.info("MongoDB connection and Beanie initialization established.")
+    except BaseException:
+        # Startup failed: do not leave the warm-up running unobserved
+        app.warm_up.cancel()
+        await asyncio.gather(app.warm_up, return_exceptions=True)
+        if mongo_client:
+            mongo_client.close()
+        raise
 
-    chroma_client = PersistentClient(path="./vector_store")
+    yield
+
+    await app.warm_up
 
-    app.chroma_client = chroma_client
-    print("🚀 ChromaDB client initialized.")
- 
-    
-    yield 
-    
     if mongo_client:
         mongo_client.close()
-        print("👋 MongoDB connection closed.")
+        logger.info("MongoDB connection closed.")
 
     del app.chroma_client
-    print("👋 ChromaDB connection closed.")
+    logger.info("ChromaDB connection closed.")
 
+    mark_worker_exited()
 
-def get_chroma_client_instance(request: Request) -> ClientAPI:
+
+async def get_chroma_client_instance(request: Request) -> "ClientAPI":
     """
-    Retrieves the initialized ChromaDB client from the FastAPI app state.
+    Retrieves the initialized ChromaDB client from the FastAPI app state,
+    waiting for the startup warm-up if it is still running.
     """
+    warm_up = getattr(request.app, "warm_up", None)
+    if warm_up is not None and not warm_up.done():
+        await asyncio.shield(warm_up)
+
     if not hasattr(request.app, "chroma_client") or request.app.chroma_client is None:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
                             detail="Vector database is not initialized.")
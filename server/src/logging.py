@@ -1,5 +1,10 @@
+import atexit
+import json
 import logging
-from enum import Enum, StrEnum
+import queue
+from datetime import datetime, timezone
+from enum import StrEnum
+from logging.handlers import QueueHandler, QueueListener
 
 LOG_FORMAT_DEBUG = "%(levelname)s: %(message)s:%(pathname)s:%(funcName)s:%(lineno)d"
 
@@ -9,15 +14,72 @@ class LogLevels(StrEnum):
     warning = "WARNING"
     error = "ERROR"
 
-def configure_logging(log_level: str = LogLevels.error):
+
+class RequestContextFilter(logging.Filter):
+    """Stamps each record with the request/trace id of the calling context."""
+
+    def filter(self, record):
+        from .tracing import current_span_var, request_id_var
+
+        span = current_span_var.get()
+        record.request_id = request_id_var.get()
+        record.trace_id = span.trace_id if span else None
+        record.span_id = span.span_id if span else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "trace_id", "span_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+_listener: QueueListener | None = None
+
+
+def configure_logging(log_level: str = LogLevels.error, json_logs: bool = True):
+    """
+    Routes all logging through a QueueHandler so request threads only
+    enqueue records; a background QueueListener formats and writes them.
+    """
+    global _listener
+
     log_level = str(log_level).upper()
     log_levels = [level.value for level in LogLevels]
 
     if log_level not in log_levels:
-        logging.basicConfig(level=logging.error)
-        return
-    
-    if log_level == LogLevels.debug:
-        logging.basicConfig(level=logging.DEBUG, format=LOG_FORMAT_DEBUG)
+        log_level = LogLevels.error
+
+    handler = logging.StreamHandler()
+    if json_logs:
+        handler.setFormatter(JsonFormatter())
+    elif log_level == LogLevels.debug:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT_DEBUG))
+
+    if _listener is not None:
+        _listener.stop()
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(log_level)
 
-    logging.basicConfig(level=log_level)
\ No newline at end of file
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
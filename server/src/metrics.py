@@ -0,0 +1,141 @@
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Pipeline stages: extract, header_footer_detect, clean, chunk, embed_batch,
+# embed_query, chroma_add, chroma_query, chroma_get, matrix_load, matrix_search,
+# llm_generate
+STAGE_LATENCY = Histogram(
+    "rag_stage_seconds",
+    "Latency of each RAG pipeline stage.",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+PAGES = Counter("rag_pages_total", "PDF pages extracted.")
+CHUNKS = Counter("rag_chunks_total", "Chunks produced for embedding.")
+TOKENS = Counter("rag_llm_tokens_total", "LLM tokens used by answers.", ["kind"])
+LLM_ANSWERS = Counter("rag_llm_answers_total", "Answers by model tier (default, fast, or none when no chunk passed the relevance cutoff).", ["tier"])
+LLM_TIER_TOKENS = Counter("rag_llm_tier_tokens_total", "LLM tokens by model tier.", ["tier", "kind"])
+LLM_TIER_LATENCY = Histogram(
+    "rag_llm_tier_seconds",
+    "Answer generation latency by model tier.",
+    ["tier"],
+    buckets=(0.1, 0.25, 0.5, 1, 1.5, 2, 3, 5, 8, 13, 20, 30, 60),
+)
+TOKENS_SAVED = Counter("rag_llm_tokens_saved_total", "Estimated prompt tokens not sent: chunks below the relevance cutoff, or whole prompts skipped.", ["reason"])
+CACHE_REQUESTS = Counter("rag_cache_requests_total", "Cache lookups.", ["cache", "result"])
+EMBED_RETRIES = Counter("rag_embed_retries_total", "Retried embedding calls, any provider.", ["call"])
+EMBED_BATCH_SIZE = Histogram(
+    "rag_embed_batch_texts",
+    "Texts per upstream embedding call after cross-request batching.",
+    ["task_type"],
+    buckets=(1, 2, 4, 8, 16, 32, 48, 64, 96),
+)
+UPSTREAM_LATENCY = Histogram(
+    "rag_upstream_seconds",
+    "Latency of successful embedding/LLM calls, hedges included.",
+    ["call"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 8, 13, 20, 30, 60),
+)
+UPSTREAM_CALLS = Counter("rag_upstream_calls_total", "Embedding/LLM calls by outcome (ok, error, timeout, rejected).", ["call", "outcome"])
+HEDGES = Counter("rag_hedged_requests_total", "Hedged duplicate calls: won, or wasted when the other request finished first.", ["call", "result"])
+IN_FLIGHT = Gauge("rag_in_flight_jobs", "Pipeline jobs currently running or queued.", ["kind"], multiprocess_mode="livesum")
+
+
+def stage_timer(stage: str):
+    """Context manager/decorator that records one stage's latency."""
+    return STAGE_LATENCY.labels(stage).time()
+
+
+class _StatsCollector:
+    """
+    Exposes the admission controller, embedding cache, circuit breaker and
+    password-hash pool counters, read at scrape time so the request path
+    pays nothing for them.
+    """
+
+    def describe(self):
+        # Without this, registering calls collect() at import time, which
+        # would import the modules below while they may still be importing us
+        return []
+
+    def collect(self):
+        from .services.admission import admission_controller
+        from .services.embedding_cache import embedding_cache
+        from .utils.generate_hash import hash_pool_stats
+
+        running = GaugeMetricFamily("rag_admission_running", "Admitted jobs running.", labels=["work_class"])
+        waiting = GaugeMetricFamily("rag_admission_waiting", "Jobs waiting for admission.", labels=["work_class"])
+        admitted = CounterMetricFamily("rag_admission_admitted", "Jobs admitted.", labels=["work_class"])
+        rejected = CounterMetricFamily("rag_admission_rejected", "Jobs rejected (queue full or timed out).", labels=["work_class"])
+        wait = CounterMetricFamily("rag_admission_wait_seconds", "Total time spent waiting for admission.", labels=["work_class"])
+
+        for name, stats in admission_controller.stats().items():
+            running.add_metric([name], stats["running"])
+            waiting.add_metric([name], stats["waiting"])
+            admitted.add_metric([name], stats["admitted"])
+            rejected.add_metric([name], stats["rejected"])
+            wait.add_metric([name], stats["wait_seconds_total"])
+
+        yield from (running, waiting, admitted, rejected, wait)
+
+        cache = embedding_cache.stats()
+        yield GaugeMetricFamily("rag_embedding_cache_bytes", "Memory held by cached embedding matrices.", value=cache["bytes"])
+        yield GaugeMetricFamily("rag_embedding_cache_max_bytes", "Embedding matrix cache budget.", value=cache["max_bytes"])
+        yield GaugeMetricFamily("rag_embedding_cache_entries", "Files with a cached embedding matrix.", value=cache["entries"])
+        yield GaugeMetricFamily("rag_embedding_cache_hit_ratio", "Embedding matrix cache hits per lookup.", value=cache["hit_rate"])
+        yield CounterMetricFamily("rag_embedding_cache_evictions", "Matrices evicted to stay within budget.", value=cache["evictions"])
+
+        from .providers.resilience import resilient
+
+        breaker_open = GaugeMetricFamily("rag_circuit_open", "1 while a circuit breaker rejects calls, 0.5 half-open.", labels=["service"])
+        breaker_opened = CounterMetricFamily("rag_circuit_opened", "Times a circuit breaker opened.", labels=["service"])
+        for name, stats in resilient.stats().items():
+            breaker_open.add_metric([name], {"closed": 0, "half_open": 0.5, "open": 1}[stats["state"]])
+            breaker_opened.add_metric([name], stats["opened"])
+        yield from (breaker_open, breaker_opened)
+
+        yield GaugeMetricFamily("rag_password_hash_in_flight", "Password hashes running.", value=hash_pool_stats["in_flight"])
+        yield GaugeMetricFamily("rag_password_hash_queued", "Password hashes waiting for a worker.", value=hash_pool_stats["queued"])
+        yield CounterMetricFamily("rag_password_hash_wait_seconds", "Total time password hashes waited.", value=hash_pool_stats["wait_seconds_total"])
+
+
+_stats_collector = _StatsCollector()
+REGISTRY.register(_stats_collector)
+
+
+def _multiprocess() -> bool:
+    # Read by prometheus_client when metrics are created, so it must be set
+    # in the process environment (not .env) before the workers start
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Prometheus text exposition of every registered metric.
+
+    With several workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+    shared by them (cleared before each start): counters, histograms and
+    in-flight gauges are then summed over all workers. The scrape-time
+    stats (admission, caches, breakers) stay those of the worker that
+    answered the scrape.
+    """
+    if not _multiprocess():
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+    from prometheus_client import CollectorRegistry, multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_stats_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_exited() -> None:
+    """Drops this worker's live gauges from the shared multiprocess files."""
+    if _multiprocess():
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(os.getpid())
@@ -1,5 +1,6 @@
-from beanie import Document, Link
-from pydantic import EmailStr, Field
+from beanie import Document, Indexed, Link
+from pydantic import EmailStr
+from pymongo import ASCENDING, IndexModel
 from datetime import datetime
 
 class User(Document):
@@ -7,7 +8,9 @@ class User(Document):
     User model representing a user in the system.
     """
 
-    email: EmailStr = Field(..., unique=True)
+    # Indexed() is what makes Beanie build the unique index at startup;
+    # Field(unique=True) is ignored and left every email lookup scanning.
+    email: Indexed(EmailStr, unique=True)
     full_name: str 
     password_hash: str
 
@@ -19,10 +22,16 @@ class RefreshToken(Document):
     """
     Model representing a refresh token associated with a user.
     """
-    token_hash: str 
+    token_hash: Indexed(str, unique=True)
     user: Link[User]
     expires_at: datetime
     created_at: datetime
     
     class Settings:
-        name = "refresh_tokens"
\ No newline at end of file
+        name = "refresh_tokens"
+        indexes = [
+            # Revoking every token of a user (Link is stored as a DBRef)
+            IndexModel([("user.$id", ASCENDING)], name="user_id"),
+            # MongoDB drops expired tokens on its own
+            IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+        ]
@@ -22,6 +22,16 @@ class AuthResponse(BaseModel):
     message: str
     user: UserPublic
     access_token: str
+    refresh_token: str | None = None
+    token_type: str = "bearer"
+
+class RefreshRequest(BaseModel):
+    """Model for exchanging a refresh token for a new token pair."""
+    refresh_token: str
+
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
     token_type: str = "bearer"
 
 
@@ -0,0 +1,34 @@
+from functools import lru_cache
+
+from ..core.config import settings
+from .base import EmbeddingProvider, LLMProvider
+
+
+@lru_cache(maxsize=1)
+def get_embedding_provider() -> EmbeddingProvider:
+    """The embedding backend selected by EMBEDDING_PROVIDER (gemini or onnx)."""
+    if settings.EMBEDDING_PROVIDER == "gemini":
+        from .gemini import GeminiEmbeddingProvider
+        return GeminiEmbeddingProvider(settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION)
+
+    if settings.EMBEDDING_PROVIDER == "onnx":
+        from .onnx_local import OnnxEmbeddingProvider
+        return OnnxEmbeddingProvider(
+            settings.LOCAL_EMBEDDING_MODEL_DIR,
+            batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE,
+            threads=settings.LOCAL_EMBEDDING_THREADS,
+        )
+
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {settings.EMBEDDING_PROVIDER}")
+
+
+@lru_cache(maxsize=2)
+def get_llm_provider(tier: str = "default") -> LLMProvider:
+    """The answer generation backend selected by LLM_PROVIDER; tier "fast" uses LLM_MODEL_FAST."""
+    model = settings.LLM_MODEL_FAST if tier == "fast" else settings.LLM_MODEL
+
+    if settings.LLM_PROVIDER == "gemini":
+        from .gemini import GeminiLLMProvider
+        return GeminiLLMProvider(model)
+
+    raise ValueError(f"Unknown LLM_PROVIDER: {settings.LLM_PROVIDER}")
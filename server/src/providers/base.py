@@ -0,0 +1,47 @@
+from abc import ABC, abstractmethod
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns text into vectors. Implementations return raw (unnormalized)
+    vectors; normalization and retries live in utils/embedder.py.
+    """
+
+    name: str = ""
+    model: str = ""
+    dimension: int = 0
+    # Longest input (in the model's own tokens) embedded without truncation;
+    # 0 when the backend reports no limit
+    max_input_tokens: int = 0
+
+    @property
+    def model_id(self) -> str:
+        """Recorded on the Chroma collection so vectors from different models never mix."""
+        return f"{self.name}:{self.model}:{self.dimension}"
+
+    @abstractmethod
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        ...
+
+    @abstractmethod
+    def embed_query(self, text: str) -> list[float]:
+        ...
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Query-side embeddings for several questions; backends batch where they can."""
+        return [self.embed_query(t) for t in texts]
+
+    @abstractmethod
+    def count_tokens(self, text: str) -> int:
+        ...
+
+
+class LLMProvider(ABC):
+    """Generates an answer for a prompt."""
+
+    name: str = ""
+    model: str = ""
+
+    @abstractmethod
+    def generate(self, prompt: str) -> tuple[str, dict]:
+        """Returns (text, usage) with usage holding prompt_tokens/output_tokens when known."""
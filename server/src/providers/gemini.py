@@ -0,0 +1,110 @@
+import threading
+
+import httpx
+from google import genai
+from google.genai import types
+
+from ..core.config import settings
+from .base import EmbeddingProvider, LLMProvider
+
+# One client shared by every Gemini provider. The app creates it during
+# startup (see lifespan_db); scripts without a lifespan get it on first use.
+client: genai.Client | None = None
+_client_lock = threading.Lock()
+
+
+def create_genai_client() -> genai.Client:
+    """Gemini client over one pooled keep-alive HTTP connection pool."""
+    # Per-call deadlines live in providers/resilience.py; the HTTP timeout
+    # only frees the worker thread of a call that was already abandoned
+    timeout = max(settings.UPSTREAM_EMBED_DEADLINE_SECONDS, settings.UPSTREAM_GENERATE_DEADLINE_SECONDS)
+
+    return genai.Client(
+        api_key=settings.GENAI_API_KEY,  # GENAI_API_KEY must be set
+        http_options=types.HttpOptions(
+            timeout=int(timeout * 1000),
+            client_args={
+                "limits": httpx.Limits(
+                    max_connections=settings.GENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.GENAI_KEEPALIVE_CONNECTIONS,
+                ),
+            },
+        ),
+    )
+
+
+def set_client(new_client) -> None:
+    """Installs the shared client (created in lifespan, or a stand-in)."""
+    global client
+    client = new_client
+
+
+def get_client() -> genai.Client:
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                client = create_genai_client()
+    return client
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    name = "gemini"
+
+    def __init__(self, model: str, dimension: int):
+        self.model = model
+        self.dimension = dimension
+
+    def _embed(self, texts: list[str], task_type: str) -> list[list[float]]:
+        response = get_client().models.embed_content(
+            model=self.model,
+            contents=[types.Content(parts=[types.Part(text=t)]) for t in texts],
+            config=types.EmbedContentConfig(task_type=task_type, output_dimensionality=self.dimension)
+        )
+
+        if not response.embeddings:
+            raise RuntimeError("No embedding returned from Gemini.")
+
+        return [emb.values for emb in response.embeddings]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed(texts, "RETRIEVAL_DOCUMENT")
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed([text], "RETRIEVAL_QUERY")[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return self._embed(texts, "RETRIEVAL_QUERY")
+
+    def count_tokens(self, text: str) -> int:
+        return get_client().models.count_tokens(
+            model=self.model,
+            contents=text
+        ).total_tokens
+
+
+class GeminiLLMProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def generate(self, prompt: str) -> tuple[str, dict]:
+        response = get_client().models.generate_content(
+            model=self.model,
+            contents=[
+                {
+                    "role": "user",
+                    "parts": [
+                        {"text": prompt}
+                    ]
+                }
+            ]
+        )
+
+        meta = getattr(response, "usage_metadata", None)
+        usage = {
+            "prompt_tokens": getattr(meta, "prompt_token_count", None),
+            "output_tokens": getattr(meta, "candidates_token_count", None),
+        }
+        return response.text, usage
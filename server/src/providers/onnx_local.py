@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+
+from .base import EmbeddingProvider
+
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """
+    Local CPU sentence-embedding backend (e.g. an ONNX export of
+    all-MiniLM-L6-v2 or bge-small). `model_dir` must contain model.onnx
+    and tokenizer.json. Works without network access.
+
+    Texts are sorted by length and run in fixed-size batches so padding
+    stays small; onnxruntime spreads each batch over `threads` cores.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str, batch_size: int = 32, threads: int = 0, max_length: int = 512):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDING_PROVIDER=onnx needs the optional packages onnxruntime and tokenizers."
+            ) from e
+
+        model_path = os.path.join(model_dir, "model.onnx")
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        if not os.path.exists(model_path) or not os.path.exists(tokenizer_path):
+            raise RuntimeError(f"Expected model.onnx and tokenizer.json in {model_dir}.")
+
+        self.model = os.path.basename(os.path.normpath(model_dir))
+        self.batch_size = batch_size
+
+        self.max_input_tokens = max_length
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        # Counting must see the whole text, or nothing ever looks too long
+        self.counter = Tokenizer.from_file(tokenizer_path)
+        self.counter.no_truncation()
+        self.counter.no_padding()
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or os.cpu_count() or 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.dimension = len(self._run(["dimension probe"])[0])
+
+    def _run(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        output = self.session.run(None, {k: v for k, v in feed.items() if k in self.input_names})[0]
+
+        if output.ndim == 2:
+            # Model already pools to one vector per text
+            return output.astype(np.float32)
+
+        # Mean pooling over real (non-padding) tokens
+        mask = attention_mask[..., None].astype(np.float32)
+        return ((output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)).astype(np.float32)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: list = [None] * len(texts)
+
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start : start + self.batch_size]
+            for i, vec in zip(idx, self._run([texts[i] for i in idx])):
+                vectors[i] = vec.tolist()
+
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._run([text])[0].tolist()
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents(texts)
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.counter.encode(text).ids)
@@ -0,0 +1,234 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ..core.config import settings
+from ..metrics import HEDGES, UPSTREAM_CALLS, UPSTREAM_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(Exception):
+    """An embedding/LLM call could not be served; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(UpstreamUnavailable):
+    pass
+
+
+class DeadlineExceeded(UpstreamUnavailable, TimeoutError):
+    pass
+
+
+class LatencyTracker:
+    """Recent successful call latencies, used to pick the hedge delay."""
+
+    def __init__(self, window: int = 256, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> float | None:
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive failed calls and rejects calls for
+    `recovery_seconds`; then lets a single probe through (half-open) and
+    closes again once a call succeeds.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failures: int, recovery_seconds: float):
+        self.name = name
+        self.failures = failures
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened_count = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> int:
+        return max(1, int(self.opened_at + self.recovery_seconds - time.monotonic()) + 1)
+
+    def before_call(self) -> None:
+        """Raises CircuitOpen unless the call may go ahead."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_seconds:
+                self.state = self.HALF_OPEN
+
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+
+        raise CircuitOpen(f"{self.name} calls are failing, circuit open.", self.retry_after())
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit %s closed.", self.name)
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probing = False
+
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failures:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit %s opened after %d failures.", self.name, self.consecutive_failures)
+                    self.opened_count += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "opened": self.opened_count,
+            }
+
+
+class ResilientCaller:
+    """
+    Runs provider calls in a dedicated pool so each one can be given a
+    deadline, hedges idempotent calls with a duplicate request once they
+    take longer than the recent p95, and guards every call with a
+    per-service circuit breaker.
+
+    A call that misses its deadline is abandoned, not cancelled (blocking
+    HTTP calls cannot be interrupted); the HTTP client timeout of the
+    provider bounds how long its thread stays busy.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=settings.UPSTREAM_WORKERS, thread_name_prefix="upstream")
+        self.breakers = {
+            name: CircuitBreaker(name, settings.UPSTREAM_BREAKER_FAILURES, settings.UPSTREAM_BREAKER_RECOVERY_SECONDS)
+            for name in ("embed", "generate")
+        }
+        self.latency: dict[str, LatencyTracker] = {}
+        self.calls: dict[str, int] = {}
+        self.hedges: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _submit(self, func, *args):
+        # Copy the caller's context so spans opened by the call nest under it
+        ctx = contextvars.copy_context()
+        return self.executor.submit(ctx.run, func, *args)
+
+    def _hedge_delay(self, call: str) -> float:
+        p = self.latency[call].percentile(settings.UPSTREAM_HEDGE_PERCENTILE)
+        if p is None:
+            return settings.UPSTREAM_HEDGE_INITIAL_DELAY_SECONDS
+        return max(settings.UPSTREAM_HEDGE_MIN_DELAY_SECONDS, p)
+
+    def _may_hedge(self, call: str) -> bool:
+        """Hedges are capped at UPSTREAM_HEDGE_MAX_RATIO of calls, so a slow upstream is not doubled."""
+        with self._lock:
+            if self.hedges.get(call, 0) >= settings.UPSTREAM_HEDGE_MAX_RATIO * self.calls.get(call, 0):
+                return False
+            self.hedges[call] = self.hedges.get(call, 0) + 1
+            return True
+
+    def call(self, service: str, call: str, func, *args, deadline: float, hedge: bool = False):
+        """
+        Runs func(*args) for `call` against `service` ("embed"/"generate").
+        Raises CircuitOpen without calling when the breaker is open and
+        DeadlineExceeded when no attempt finished within `deadline` seconds.
+        """
+        breaker = self.breakers[service]
+        try:
+            breaker.before_call()
+        except CircuitOpen:
+            UPSTREAM_CALLS.labels(call, "rejected").inc()
+            raise
+
+        with self._lock:
+            self.latency.setdefault(call, LatencyTracker())
+            self.calls[call] = self.calls.get(call, 0) + 1
+
+        start = time.perf_counter()
+        try:
+            result = self._run(call, func, args, start + deadline, hedge and settings.UPSTREAM_HEDGE_ENABLED)
+        except DeadlineExceeded:
+            breaker.record_failure()
+            UPSTREAM_CALLS.labels(call, "timeout").inc()
+            raise
+        except Exception:
+            breaker.record_failure()
+            UPSTREAM_CALLS.labels(call, "error").inc()
+            raise
+
+        elapsed = time.perf_counter() - start
+        breaker.record_success()
+        self.latency[call].record(elapsed)
+        UPSTREAM_LATENCY.labels(call).observe(elapsed)
+        UPSTREAM_CALLS.labels(call, "ok").inc()
+        return result
+
+    def _run(self, call: str, func, args, deadline_at: float, hedge: bool):
+        primary = self._submit(func, *args)
+        pending = {primary}
+        hedged = None
+        error = None
+
+        if hedge:
+            delay = min(self._hedge_delay(call), deadline_at - time.perf_counter())
+            done, _ = wait(pending, timeout=max(0.0, delay))
+            if not done and self._may_hedge(call):
+                hedged = self._submit(func, *args)
+                pending.add(hedged)
+
+        while pending:
+            remaining = deadline_at - time.perf_counter()
+            if remaining <= 0:
+                break
+
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if hedged is not None:
+                        # The losing request's work is thrown away
+                        HEDGES.labels(call, "won" if future is hedged else "wasted").inc()
+                    return future.result()
+                error = future.exception()
+
+        if hedged is not None:
+            HEDGES.labels(call, "wasted").inc()
+
+        if error is not None and not pending:
+            raise error
+
+        raise DeadlineExceeded(f"{call} did not finish within its deadline.")
+
+    def stats(self) -> dict:
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+
+resilient = ResilientCaller()
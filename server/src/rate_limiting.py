@@ -1,4 +1,109 @@
+import math
+import time
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from jwt import decode, PyJWTError
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)  
\ No newline at end of file
+from .core.config import settings
+from .core.security import get_current_user
+from .models.document import User
+
+
+def get_user_key(request: Request) -> str:
+    """
+    Rate limit key: the JWT subject when a valid bearer token is present,
+    the client IP otherwise (login/signup). Decoding only, no DB lookup.
+    """
+    auth = request.headers.get("authorization", "")
+    scheme, _, token = auth.partition(" ")
+
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except PyJWTError:
+            pass
+
+    return f"ip:{get_remote_address(request)}"
+
+
+# Request-rate limits (every route). "memory://" keeps counters per process;
+# point RATE_LIMIT_STORAGE_URI at e.g. redis:// to share them between workers.
+limiter = Limiter(
+    key_func=get_user_key,
+    default_limits=[settings.RATE_LIMIT_DEFAULT],
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    headers_enabled=True,
+)
+
+
+# --- Cost quota ---
+# Uploads and queries are charged in cost units on top of the request rate:
+#   pages ingested, embedding calls and LLM prompt + output tokens.
+
+quota_storage = storage_from_string(settings.RATE_LIMIT_STORAGE_URI)
+quota_limiter = FixedWindowRateLimiter(quota_storage)
+quota_item = parse(settings.COST_QUOTA)
+
+
+def compute_cost(pages: int = 0, embed_calls: int = 0, tokens: int = 0) -> int:
+    """Weights the work done by one request into quota units."""
+    cost = (
+        pages * settings.COST_PER_PAGE
+        + embed_calls * settings.COST_PER_EMBED_CALL
+        + tokens * settings.COST_PER_1K_TOKENS / 1000
+    )
+    return max(1, math.ceil(cost))
+
+
+def quota_headers(user_id: str) -> dict:
+    stats = quota_limiter.get_window_stats(quota_item, "cost", user_id)
+    return {
+        "X-Quota-Limit": str(quota_item.amount),
+        "X-Quota-Remaining": str(stats.remaining),
+        "X-Quota-Reset": str(int(stats.reset_time)),
+    }
+
+
+def enforce_quota(current_user: User = Depends(get_current_user)) -> str:
+    """
+    Dependency: rejects the request with 429 once the user's cost quota
+    for the current window is used up. Returns the user id to charge.
+    Sync on purpose: FastAPI runs it in the threadpool, so a Redis quota
+    storage never blocks the event loop.
+    """
+    user_id = str(current_user.id)
+
+    if not quota_limiter.test(quota_item, "cost", user_id):
+        headers = quota_headers(user_id)
+        headers["Retry-After"] = str(max(1, int(int(headers["X-Quota-Reset"]) - time.time())))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Usage quota exceeded, retry later.",
+            headers=headers,
+        )
+
+    return user_id
+
+
+def charge_quota(user_id: str, cost: int, response: Response | None = None) -> None:
+    """
+    Charges the actual cost of a finished request and sets quota headers
+    (skipped for streamed responses, whose headers are already sent).
+    The real cost is only known after the work is done, so a request that
+    overshoots the remaining budget drains it instead of being refunded.
+    Blocking (storage round trips): call it with run_in_threadpool.
+    """
+    if not quota_limiter.hit(quota_item, "cost", user_id, cost=cost):
+        remaining = quota_limiter.get_window_stats(quota_item, "cost", user_id).remaining
+        if remaining > 0:
+            quota_limiter.hit(quota_item, "cost", user_id, cost=remaining)
+
+    if response is not None:
+        response.headers.update(quota_headers(user_id))
@@ -0,0 +1,90 @@
+import logging
+
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+
+from ..core.security import get_current_user
+from ..database.connection import get_chroma_client_instance
+from ..providers.resilience import UpstreamUnavailable
+from ..services.admission import AdmissionRejected
+from ..services.rag_service import RAG_PIPLINE
+from ..rate_limiting import charge_quota, compute_cost, enforce_quota
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/files", tags=["files"])
+
+
+@router.put("/{file_id}")
+async def update_pdf(
+    file_id: str,
+    response: Response,
+    file: UploadFile = File(...),
+    current_user=Depends(get_current_user),
+    chroma_client = Depends(get_chroma_client_instance),
+    quota_user_id: str = Depends(enforce_quota)
+    ):
+    """
+    Uploads a new revision of an existing PDF. Only pages whose cleaned
+    text changed are re-chunked and re-embedded; file_id stays the same.
+    """
+    try:
+        file_bytes = await file.read()
+
+        logger.info("Starting incremental re-ingestion of %s...", file_id)
+        result = await RAG_PIPLINE(user_id=str(current_user.id), chroma_client=chroma_client).update_pdf(
+            file_id=file_id,
+            file_bytes=file_bytes,
+            filename=file.filename
+        )
+
+        await run_in_threadpool(
+            charge_quota,
+            quota_user_id,
+            compute_cost(pages=result["changed_pages"], embed_calls=result["embed_calls"]),
+            response
+        )
+
+        return result
+
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    except (AdmissionRejected, UpstreamUnavailable) as e:
+        # Fail fast instead of letting the request time out in a queue
+        # (or pile up behind a failing upstream)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Update error: {e}")
+
+
+@router.delete("/{file_id}")
+async def delete_pdf(
+    file_id: str,
+    current_user=Depends(get_current_user),
+    chroma_client = Depends(get_chroma_client_instance)
+    ):
+    """
+    Deletes every stored chunk of a PDF and drops its cached embeddings.
+    """
+    try:
+        deleted_count = await RAG_PIPLINE(user_id=str(current_user.id), chroma_client=chroma_client).delete_pdf(file_id)
+        return {"file_id": file_id, "deleted_count": deleted_count}
+
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    except (AdmissionRejected, UpstreamUnavailable) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Delete error: {e}")
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from pydantic import BaseModel
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from ..database.connection import get_chroma_client_instance
+from ..providers.resilience import UpstreamUnavailable
+from ..services.admission import AdmissionRejected
 from ..services.rag_service import RAG_PIPLINE 
+from ..core.config import settings
 from ..core.security import get_current_user
 from ..models.document import User 
+from ..rate_limiting import charge_quota, compute_cost, enforce_quota
 
 router = APIRouter(prefix="/query", tags=["query"])
 
@@ -12,15 +20,23 @@ class QueryRequest(BaseModel):
     file_id: str
     question: str
     top_k: int = 5 
+
+class BatchQueryRequest(BaseModel):
+    file_id: str
+    questions: list[str] = Field(..., min_length=1, max_length=500)
+    top_k: int = 5
+    concurrency: int | None = None
     
 @router.post("/", status_code=status.HTTP_200_OK)
 async def query_pdf(
     request: Request,
     payload: QueryRequest,
+    response: Response,
     # 🚨 FIX 1: Add authentication dependency
     current_user: User = Depends(get_current_user),
     # 🚨 FIX 2: Inject the initialized Chroma client instance
-    chroma_client = Depends(get_chroma_client_instance)
+    chroma_client = Depends(get_chroma_client_instance),
+    quota_user_id: str = Depends(enforce_quota)
 ):
     try:
         # 🚨 FIX 3: Instantiate the service correctly (Binding 'self' and dependencies)
@@ -36,8 +52,28 @@ async def query_pdf(
             top_k=payload.top_k
         )
 
+        usage = answer_data["usage"]
+        await run_in_threadpool(
+            charge_quota,
+            quota_user_id,
+            compute_cost(
+                embed_calls=usage["embed_calls"],
+                tokens=usage["prompt_tokens"] + usage["output_tokens"]
+            ),
+            response
+        )
+
         return answer_data
 
+    except (AdmissionRejected, UpstreamUnavailable) as e:
+        # Fail fast instead of letting the request time out in a queue
+        # (or pile up behind a failing upstream)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
     except ValueError as e:
         # Catch custom exception raised by the service (e.g., "No content found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -45,4 +81,69 @@ async def query_pdf(
     except Exception as e:
         # Avoid generic 500 block; FastAPI handles uncaught errors better
         # This remains for debugging external failures:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Query Error: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Query Error: {e}")
+
+@router.post("/batch", status_code=status.HTTP_200_OK)
+async def query_pdf_batch(
+    payload: BatchQueryRequest,
+    current_user: User = Depends(get_current_user),
+    chroma_client = Depends(get_chroma_client_instance),
+    quota_user_id: str = Depends(enforce_quota)
+):
+    """
+    Answers many questions about one file. Responds with NDJSON: one line
+    per answer as soon as it is ready (with the question's index), then a
+    final summary line.
+    """
+    concurrency = min(payload.concurrency or settings.BATCH_CONCURRENCY, settings.BATCH_CONCURRENCY)
+
+    try:
+        service = RAG_PIPLINE(
+            user_id=str(current_user.id),
+            chroma_client=chroma_client
+        )
+
+        answers, embed_calls = await service.answer_batch(
+            file_id=payload.file_id,
+            questions=payload.questions,
+            top_k=payload.top_k,
+            concurrency=max(1, concurrency)
+        )
+
+    except (AdmissionRejected, UpstreamUnavailable) as e:
+        # Fail fast instead of letting the request time out in a queue
+        # (or pile up behind a failing upstream)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Query Error: {e}")
+
+    async def ndjson():
+        # embed_calls were spent by retrieval already, so they are charged
+        # even when the client leaves before the summary line
+        tokens = 0
+        try:
+            async for item in answers:
+                usage = item.get("usage")
+                if usage:
+                    tokens += usage["prompt_tokens"] + usage["output_tokens"]
+
+                yield json.dumps(item) + "\n"
+        finally:
+            # Client went away: cancel the answers still being generated
+            await answers.aclose()
+            # Headers are already sent, so usage is charged once at the end
+            # (also when the client went away), off the event loop since the
+            # quota storage may be Redis
+            await run_in_threadpool(
+                charge_quota, quota_user_id, compute_cost(embed_calls=embed_calls, tokens=tokens)
+            )
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
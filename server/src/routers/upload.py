@@ -1,11 +1,18 @@
+import logging
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
 
 from ..core.security import get_current_user
 from ..database.connection import get_chroma_client_instance
+from ..providers.resilience import UpstreamUnavailable
+from ..services.admission import AdmissionRejected
 from ..services.rag_service import RAG_PIPLINE
+from ..rate_limiting import charge_quota, compute_cost, enforce_quota
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/upload", tags=["upload"])
 
 MAX_MB = 20
@@ -13,21 +20,39 @@ MAX_MB = 20
 
 @router.post("/")
 async def upload_pdf(
+    response: Response,
     file: UploadFile = File(...), 
     current_user=Depends(get_current_user),
-    chroma_client = Depends(get_chroma_client_instance)
+    chroma_client = Depends(get_chroma_client_instance),
+    quota_user_id: str = Depends(enforce_quota)
     ):
     try:
 
         file_bytes = await file.read()
 
-        print("Starting RAG pipeline processing...")
+        logger.info("Starting RAG pipeline processing...")
         result = await RAG_PIPLINE(user_id=str(current_user.id), chroma_client=chroma_client).process_pdf(
             file_bytes=file_bytes,
             filename=file.filename
         )
 
+        await run_in_threadpool(
+            charge_quota,
+            quota_user_id,
+            compute_cost(pages=result["total_pages"], embed_calls=result["embed_calls"]),
+            response
+        )
+
         return result
 
+    except (AdmissionRejected, UpstreamUnavailable) as e:
+        # Fail fast instead of letting the request time out in a queue
+        # (or pile up behind a failing upstream)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload error: {e}")
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from pymongo.errors import DuplicateKeyError
 
-from ..models.schema import AuthResponse, UserCreate, UserLogin, UserSignupProjection
+from ..models.schema import AuthResponse, RefreshRequest, TokenResponse, UserCreate, UserLogin, UserSignupProjection
 from ..models.document import User
-from ..core.security import create_access_token, create_refresh_token, get_current_user
-from ..utils.generate_hash import generate_hash, verify_hash
+from ..core.security import create_access_token, create_refresh_token, get_current_user, rotate_refresh_token
+from ..utils.generate_hash import generate_hash_async, verify_hash_async
 
 router = APIRouter(prefix="/user", tags=["user"])
 
@@ -17,7 +18,7 @@ async def create_user(user_data: UserCreate):
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
     
-    hashed_password = generate_hash(user_data.password)
+    hashed_password = await generate_hash_async(user_data.password)
 
     new_user = User(
         email=user_data.email,
@@ -25,7 +26,11 @@ async def create_user(user_data: UserCreate):
         password_hash=hashed_password
     )
 
-    await new_user.create()
+    try:
+        await new_user.create()
+    except DuplicateKeyError:
+        # Concurrent signup with the same email lost the race on the unique index
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
     access_token = create_access_token(new_user.id)
 
@@ -55,7 +60,7 @@ async def login_user(credentials: UserLogin):
     if not user_doc:
         raise invalid_credentials
 
-    if not verify_hash(credentials.password, user_doc.password_hash):
+    if not await verify_hash_async(credentials.password, user_doc.password_hash):
         raise invalid_credentials   
     
     access_token = create_access_token(user_doc.id)
@@ -69,7 +74,21 @@ async def login_user(credentials: UserLogin):
             "id": str(user_doc.id)
         },  
         "access_token": access_token,
-        
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+@router.post("/refresh", status_code=status.HTTP_200_OK, response_model=TokenResponse)
+async def refresh_tokens(payload: RefreshRequest):
+    """
+    Rotates a refresh token and issues a new access token,
+    without re-checking the password.
+    """
+    user_doc, refresh_token = await rotate_refresh_token(payload.refresh_token)
+
+    return {
+        "access_token": create_access_token(user_doc.id),
+        "refresh_token": refresh_token,
         "token_type": "bearer"
     }
 
@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..core.config import settings
+from ..tracing import span
+
+
+class AdmissionRejected(Exception):
+    """Raised when a work class queue is full or the wait timed out."""
+
+    def __init__(self, work_class: str, reason: str, retry_after: int = 1):
+        super().__init__(f"{work_class} queue {reason}, retry later.")
+        self.work_class = work_class
+        self.retry_after = retry_after
+
+
+class WorkPool:
+    """
+    One work class: a concurrency limit, a bounded wait queue and a
+    dedicated thread pool for the blocking pipeline code.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_depth: int, max_wait: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self.max_wait = max_wait
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"{name}-pool")
+
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self.queue_depth,
+            "running": self.running,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+class AdmissionController:
+    """
+    Admits pipeline work per class with strict priority: pools are listed
+    highest priority first, and a pool only starts new work while no
+    higher-priority pool has anything waiting.
+    """
+
+    def __init__(self, pools: list[WorkPool]):
+        self.pools = {p.name: p for p in pools}
+        self._order = [p.name for p in pools]
+        self._cond = asyncio.Condition()
+        self._releasing: set[asyncio.Task] = set()
+
+    def _can_start(self, pool: WorkPool) -> bool:
+        if pool.running >= pool.concurrency:
+            return False
+
+        for name in self._order:
+            if name == pool.name:
+                return True
+            if self.pools[name].waiting:
+                return False
+
+        return True
+
+    async def _acquire(self, pool: WorkPool):
+        if pool.waiting >= pool.queue_depth:
+            pool.rejected += 1
+            raise AdmissionRejected(pool.name, "is full")
+
+        queued_at = time.perf_counter()
+
+        async with self._cond:
+            pool.waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self._can_start(pool)),
+                    timeout=pool.max_wait
+                )
+            except asyncio.TimeoutError:
+                pool.rejected += 1
+                raise AdmissionRejected(pool.name, "wait timed out", retry_after=int(pool.max_wait))
+            finally:
+                pool.waiting -= 1
+                # A drained queue may unblock lower-priority pools
+                self._cond.notify_all()
+
+            pool.running += 1
+
+        wait = time.perf_counter() - queued_at
+        pool.admitted += 1
+        pool.wait_seconds_total += wait
+        pool.wait_seconds_max = max(pool.wait_seconds_max, wait)
+
+    async def _release(self, pool: WorkPool):
+        async with self._cond:
+            pool.running -= 1
+            self._cond.notify_all()
+
+    async def run(self, work_class: str, func, *args):
+        """
+        Waits for admission in `work_class`, then runs the blocking `func`
+        in that class's thread pool so the event loop stays responsive.
+        """
+        pool = self.pools[work_class]
+        with span("admission.wait", work_class=work_class, waiting=pool.waiting):
+            await self._acquire(pool)
+
+        loop = asyncio.get_running_loop()
+        # Carry the request id / current span into the worker thread
+        ctx = contextvars.copy_context()
+        future = loop.run_in_executor(pool.executor, functools.partial(ctx.run, func, *args))
+
+        # The slot is held until the thread is done, even if the caller is
+        # cancelled first (e.g. a batch stream whose client went away)
+        future.add_done_callback(lambda f: self._release_when_done(pool, f))
+        return await asyncio.shield(future)
+
+    def _release_when_done(self, pool: WorkPool, future: asyncio.Future):
+        if not future.cancelled():
+            # Nobody may be awaiting a cancelled caller's result anymore
+            future.exception()
+
+        task = asyncio.get_running_loop().create_task(self._release(pool))
+        self._releasing.add(task)
+        task.add_done_callback(self._releasing.discard)
+
+    def stats(self) -> dict:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+
+# Interactive queries first, then batch question jobs, then ingestion
+admission_controller = AdmissionController([
+    WorkPool("query", settings.QUERY_CONCURRENCY, settings.QUERY_QUEUE_DEPTH, settings.QUERY_MAX_WAIT_SECONDS),
+    WorkPool("batch", settings.BATCH_CONCURRENCY, settings.BATCH_QUEUE_DEPTH, settings.BATCH_MAX_WAIT_SECONDS),
+    WorkPool("ingest", settings.INGEST_CONCURRENCY, settings.INGEST_QUEUE_DEPTH, settings.INGEST_MAX_WAIT_SECONDS),
+])
@@ -0,0 +1,59 @@
+import copy
+import threading
+from collections import OrderedDict
+
+from ..core.config import settings
+from ..metrics import CACHE_REQUESTS
+
+CACHE_NAME = "answer"
+
+
+def _normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+class AnswerCache:
+    """
+    Last answers per (user_id, file_id, question, top_k), LRU-bounded by
+    entry count. Only read while the embedding/LLM circuit is open or a
+    call missed its deadline, so a brownout degrades to stale answers for
+    repeated questions instead of errors.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(user_id: str, file_id: str, question: str, top_k: int) -> tuple:
+        return user_id, file_id, _normalize_question(question), top_k
+
+    def put(self, user_id: str, file_id: str, question: str, top_k: int, result: dict) -> None:
+        if self.max_entries <= 0:
+            return
+
+        key = self._key(user_id, file_id, question, top_k)
+        with self._lock:
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, user_id: str, file_id: str, question: str, top_k: int) -> dict | None:
+        key = self._key(user_id, file_id, question, top_k)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+
+        CACHE_REQUESTS.labels(CACHE_NAME, "miss" if result is None else "hit").inc()
+        return copy.deepcopy(result) if result is not None else None
+
+    def invalidate_file(self, user_id: str, file_id: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[:2] == (user_id, file_id)]:
+                del self._entries[key]
+
+
+answer_cache = AnswerCache(settings.ANSWER_CACHE_SIZE)
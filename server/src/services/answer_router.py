@@ -0,0 +1,46 @@
+from ..core.config import settings
+from ..metrics import TOKENS_SAVED
+from ..utils.chunker import approx_token_count
+
+
+def select_relevant(docs: list, metadatas: list, distances: list | None) -> tuple[list, list, list]:
+    """
+    Keeps the retrieved chunks close enough to the question: within
+    RELEVANCE_MAX_DISTANCE, and within RELEVANCE_MAX_GAP of the best match.
+    Returns (docs, metadatas, distances) of the kept chunks, in rank order.
+    Without distances (or thresholds) every chunk is kept.
+    """
+    if not distances or (settings.RELEVANCE_MAX_DISTANCE is None and settings.RELEVANCE_MAX_GAP is None):
+        return docs, metadatas, distances or []
+
+    limit = float("inf")
+    if settings.RELEVANCE_MAX_DISTANCE is not None:
+        limit = settings.RELEVANCE_MAX_DISTANCE
+    if settings.RELEVANCE_MAX_GAP is not None:
+        limit = min(limit, min(distances) + settings.RELEVANCE_MAX_GAP)
+
+    kept = [i for i, d in enumerate(distances) if d <= limit]
+    if len(kept) < len(docs):
+        reason = "cutoff" if kept else "no_context"
+        TOKENS_SAVED.labels(reason).inc(
+            sum(approx_token_count(docs[i]) for i in range(len(docs)) if i not in kept)
+        )
+
+    return [docs[i] for i in kept], [metadatas[i] for i in kept], [distances[i] for i in kept]
+
+
+def choose_tier(context: str, distances: list) -> str:
+    """
+    "fast" (LLM_MODEL_FAST) for short contexts whose best chunk is a close
+    match, "default" (LLM_MODEL) otherwise.
+    """
+    if not settings.LLM_MODEL_FAST or not distances:
+        return "default"
+
+    if (
+        min(distances) <= settings.LLM_FAST_MAX_DISTANCE
+        and approx_token_count(context) <= settings.LLM_FAST_MAX_CONTEXT_TOKENS
+    ):
+        return "fast"
+
+    return "default"
@@ -1,5 +1,174 @@
+import logging
+import uuid
+import weakref
 from typing import List, Dict, Any
 
+from ..core.config import settings
+from ..database.connection import on_vector_store_retry, with_vector_store_retries
+from ..metrics import stage_timer
+from ..providers import get_embedding_provider
+from ..tracing import span
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "pdf_embeddings"
+DEFAULT_EMBEDDING_MODEL_ID = "gemini:gemini-embedding-001:1536"
+# One small record per (user, file) whose token changes on every write
+REVISIONS_COLLECTION_NAME = "file_revisions"
+
+# client -> (model_id, collection); entries go away with their client and
+# are dropped when a call fails on the connection, so the retry reopens them
+_collections: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_revision_collections: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+on_vector_store_retry(_collections.clear)
+on_vector_store_retry(_revision_collections.clear)
+
+
+def collection_name_for(model_id: str) -> str:
+    """
+    The default Gemini model keeps the original collection name; any other
+    embedding model gets its own collection so vector spaces never mix.
+    """
+    if model_id == DEFAULT_EMBEDDING_MODEL_ID:
+        return COLLECTION_NAME
+    slug = "".join(c if c.isalnum() else "_" for c in model_id)
+    return f"{COLLECTION_NAME}__{slug}"[:63]
+
+
+def hnsw_metadata(m: int | None = None, construction_ef: int | None = None, search_ef: int | None = None) -> dict:
+    """Collection metadata for a cosine HNSW index; unset parameters keep Chroma's defaults."""
+    metadata = {"hnsw:space": "cosine"}
+    for key, value in (("hnsw:M", m), ("hnsw:construction_ef", construction_ef), ("hnsw:search_ef", search_ef)):
+        if value is not None:
+            metadata[key] = value
+    return metadata
+
+
+def _open_collection(chroma_client, model_id: str):
+    """
+    Opens the collection without passing metadata, so the stored
+    embedding_model is what gets checked; creates it on first use.
+    """
+    from chromadb.errors import ChromaError, NotFoundError
+
+    name = collection_name_for(model_id)
+    try:
+        return chroma_client.get_collection(name)
+    except NotFoundError:
+        pass
+
+    metadata = {
+        **hnsw_metadata(settings.HNSW_M, settings.HNSW_CONSTRUCTION_EF, settings.HNSW_SEARCH_EF),
+        "embedding_model": model_id,
+    }
+    try:
+        return chroma_client.create_collection(name, metadata=metadata)
+    except ChromaError:
+        # Another worker created it first
+        return chroma_client.get_collection(name)
+
+
+def _apply_search_ef(collection) -> None:
+    """
+    search_ef is the one HNSW parameter that can change after creation;
+    brings an existing collection in line with HNSW_SEARCH_EF.
+    """
+    ef = settings.HNSW_SEARCH_EF
+    if ef is None:
+        return
+
+    hnsw = (getattr(collection, "configuration", None) or {}).get("hnsw") or {}
+    if hnsw.get("ef_search") == ef:
+        return
+
+    try:
+        collection.modify(configuration={"hnsw": {"ef_search": ef}})
+        logger.info("Set search_ef=%d on collection %s.", ef, collection.name)
+    except TypeError:
+        logger.warning(
+            "This Chroma version cannot change search_ef of an existing collection; "
+            "HNSW_SEARCH_EF only applies to new collections."
+        )
+
+
+def get_embedding_collection(chroma_client):
+    """
+    Opens (or creates) the collection for the active embedding provider and
+    checks that it was built by that same model. The handle is cached per
+    client, so regular operations cost no extra round trip.
+    """
+    model_id = get_embedding_provider().model_id
+
+    cached = _collections.get(chroma_client)
+    if cached is not None and cached[0] == model_id:
+        return cached[1]
+
+    collection = _open_collection(chroma_client, model_id)
+
+    # Collections created before the model was recorded hold default Gemini vectors
+    recorded = (collection.metadata or {}).get("embedding_model", DEFAULT_EMBEDDING_MODEL_ID)
+    if recorded != model_id:
+        raise RuntimeError(
+            f"Collection {collection.name} holds {recorded} embeddings, "
+            f"but the active embedding model is {model_id}."
+        )
+
+    _apply_search_ef(collection)
+
+    _collections[chroma_client] = (model_id, collection)
+    return collection
+
+
+def _revisions(chroma_client):
+    """The revision marker collection, cached per client like the embeddings one."""
+    collection = _revision_collections.get(chroma_client)
+    if collection is None:
+        collection = chroma_client.get_or_create_collection(REVISIONS_COLLECTION_NAME)
+        _revision_collections[chroma_client] = collection
+    return collection
+
+
+def _revision_id(file_id: str, user_id: str) -> str:
+    return f"{user_id}:{file_id}"
+
+
+def _touch_revision(chroma_client, file_id: str, user_id: str) -> str:
+    revision = uuid.uuid4().hex
+    _revisions(chroma_client).upsert(
+        ids=[_revision_id(file_id, user_id)],
+        # Markers are looked up by id only; the vector is a placeholder
+        embeddings=[[1.0]],
+        metadatas=[{"file_id": file_id, "user_id": user_id, "revision": revision}],
+    )
+    return revision
+
+
+@with_vector_store_retries
+def touch_file_revision(chroma_client, file_id: str, user_id: str) -> str:
+    """
+    Gives the file a new revision token. Called after its chunks were
+    written, so a reader that saw the old token reloads at worst once more.
+    """
+    return _touch_revision(chroma_client, file_id, user_id)
+
+
+@with_vector_store_retries
+def get_file_revision(chroma_client, file_id: str, user_id: str) -> str | None:
+    """
+    The file's current revision token: one primary-key lookup. None for
+    files never written through chroma_ops since markers were introduced.
+    """
+    marker = _revisions(chroma_client).get(ids=[_revision_id(file_id, user_id)], include=["metadatas"])
+    return marker["metadatas"][0]["revision"] if marker["ids"] else None
+
+
+@with_vector_store_retries
+def drop_file_revision(chroma_client, file_id: str, user_id: str) -> None:
+    """Removes the file's revision marker."""
+    _revisions(chroma_client).delete(ids=[_revision_id(file_id, user_id)])
+
+
+@with_vector_store_retries
 def add_embeddings(
     chroma_client,
     chunks: List[str],               
@@ -15,17 +184,23 @@ def add_embeddings(
     - metadatas: list of metadata dicts (file_id, page_number, token_count)
     """
 
-    collection = chroma_client.get_collection("pdf_embeddings")
-    collection.add(
-        ids=ids,
-        documents=chunks,
-        embeddings=embeddings,
-        metadatas=metadatas
-    )
+    collection = get_embedding_collection(chroma_client)
+    # upsert rather than add, so a retried call after a dropped connection is idempotent
+    with stage_timer("chroma_add"), span("chroma.add", count=len(ids)):
+        collection.upsert(
+            ids=ids,
+            documents=chunks,
+            embeddings=embeddings,
+            metadatas=metadatas
+        )
+
+    for file_id, user_id in {(m["file_id"], m["user_id"]) for m in metadatas}:
+        _touch_revision(chroma_client, file_id, user_id)
 
-    print(f"✅ Added {len(ids)} embeddings to Chroma.")
+    logger.info("Added %d embeddings to Chroma.", len(ids))
     return len(ids)
 
+@with_vector_store_retries
 def query_similar_chunks(
     chroma_client,
     file_id: str,
@@ -38,26 +213,140 @@ def query_similar_chunks(
     Returns full Chroma result.
     """
 
-    collection = chroma_client.get_collection("pdf_embeddings")
+    collection = get_embedding_collection(chroma_client)
 
-    return collection.query(
-        query_embeddings=[query_embedding],
-        n_results=top_k,
-        where={"$and": [{"file_id": file_id}, {"user_id": user_id}]}
-    )
+    with stage_timer("chroma_query"), span("chroma.query", top_k=top_k):
+        return collection.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k,
+            where={"$and": [{"file_id": file_id}, {"user_id": user_id}]}
+        )
+
+@with_vector_store_retries
+def query_similar_chunks_batch(
+    chroma_client,
+    file_id: str,
+    user_id: str,
+    query_embeddings: List[List[float]],
+    top_k: int
+):
+    """
+    One filtered Chroma query for many query embeddings.
+    Result lists are indexed in the same order as query_embeddings.
+    """
 
-def delete_file_chunks(file_id: str, chroma_client) -> int:
+    collection = get_embedding_collection(chroma_client)
+
+    with stage_timer("chroma_query"), span("chroma.query", top_k=top_k, queries=len(query_embeddings)):
+        return collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            where={"$and": [{"file_id": file_id}, {"user_id": user_id}]}
+        )
+
+@with_vector_store_retries
+def delete_file_chunks(file_id: str, chroma_client, user_id: str | None = None) -> int:
     """
-    Delete all embeddings belonging to file_id.
+    Delete all embeddings belonging to file_id (and to user_id, when given).
     """
 
-    collection = chroma_client.get_collection("pdf_embeddings")
+    collection = get_embedding_collection(chroma_client)
+
+    where = {"file_id": file_id}
+    if user_id is not None:
+        where = {"$and": [where, {"user_id": user_id}]}
 
-    items = collection.get(where={"file_id": file_id})
+    items = collection.get(where=where, include=[])
 
     ids = items.get("ids", [])
 
     if ids:
         collection.delete(ids=ids)
 
+    # A missing marker never matches a cached revision
+    _revisions(chroma_client).delete(where=where)
+
+    return len(ids)
+
+@with_vector_store_retries
+def get_file_chunks(chroma_client, file_id: str, user_id: str) -> dict:
+    """
+    Ids and metadatas (no vectors, no documents) of every chunk of a file.
+    """
+    collection = get_embedding_collection(chroma_client)
+
+    return collection.get(
+        where={"$and": [{"file_id": file_id}, {"user_id": user_id}]},
+        include=["metadatas"]
+    )
+
+@with_vector_store_retries
+def get_file_embeddings(chroma_client, file_id: str, user_id: str, limit: int | None = None) -> dict:
+    """
+    Every chunk of a file with its vector, document and metadata
+    (at most `limit` of them, when given).
+    """
+    collection = get_embedding_collection(chroma_client)
+
+    with stage_timer("chroma_get"), span("chroma.get", file_id=file_id):
+        return collection.get(
+            where={"$and": [{"file_id": file_id}, {"user_id": user_id}]},
+            include=["embeddings", "documents", "metadatas"],
+            limit=limit
+        )
+
+@with_vector_store_retries
+def get_chunk_ids(chroma_client, where: dict) -> list[str]:
+    """
+    Ids of every chunk matching `where`, sorted: a stable cursor for
+    paging through large result sets with get_chunks_by_ids.
+    """
+    collection = get_embedding_collection(chroma_client)
+
+    with stage_timer("chroma_get"), span("chroma.get_ids"):
+        return sorted(collection.get(where=where, include=[])["ids"])
+
+@with_vector_store_retries
+def get_chunks_by_ids(chroma_client, ids: List[str]) -> dict:
+    """
+    Chunks (ids, vectors, documents, metadatas) by id, for streaming
+    exports; a primary-key lookup, so every page costs the same.
+    """
+    collection = get_embedding_collection(chroma_client)
+
+    with stage_timer("chroma_get"), span("chroma.get", count=len(ids)):
+        return collection.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+
+@with_vector_store_retries
+def get_chunk_owners(chroma_client, ids: List[str]) -> dict:
+    """
+    user_id of each of the given chunk ids that already exists.
+    """
+    collection = get_embedding_collection(chroma_client)
+
+    existing = collection.get(ids=ids, include=["metadatas"])
+    return {cid: (meta or {}).get("user_id") for cid, meta in zip(existing["ids"], existing["metadatas"])}
+
+@with_vector_store_retries
+def update_chunk_metadatas(chroma_client, ids: List[str], metadatas: List[Dict[str, Any]]) -> int:
+    """
+    Merges the given metadata fields into existing chunks; vectors are untouched.
+    """
+    if not ids:
+        return 0
+
+    collection = get_embedding_collection(chroma_client)
+    collection.update(ids=ids, metadatas=metadatas)
+    return len(ids)
+
+@with_vector_store_retries
+def delete_chunks(chroma_client, ids: List[str]) -> int:
+    """
+    Delete embeddings by chunk id.
+    """
+    if not ids:
+        return 0
+
+    collection = get_embedding_collection(chroma_client)
+    collection.delete(ids=ids)
     return len(ids)
@@ -0,0 +1,238 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from ..core.config import settings
+from ..metrics import CACHE_REQUESTS, stage_timer
+from ..tracing import span
+from .chroma_ops import drop_file_revision, get_file_embeddings, get_file_revision, touch_file_revision
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = "embedding_matrix"
+
+
+class FileMatrix:
+    """
+    All chunks of one file: a (chunks x dim) float32 matrix of unit-length
+    rows plus the chunk ids, documents and metadatas in the same order.
+    """
+
+    def __init__(self, ids: list, embeddings, documents: list, metadatas: list):
+        import numpy as np  # deferred until the first load, keeps startup fast
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        self.matrix = matrix / norms
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        # Vectors dominate; documents are counted by their UTF-8 length
+        self.nbytes = self.matrix.nbytes + sum(len(d.encode()) for d in self.documents)
+        # Set by the cache: revision token loaded, and when it was last confirmed
+        self.revision: str | None = None
+        self.checked_at = 0.0
+
+    def search(self, query_embeddings: list, top_k: int) -> dict:
+        """
+        Exact cosine search of every query against every chunk in one matmul.
+        Returns the same shape as a Chroma query result.
+        """
+        import numpy as np
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        scores = (queries / norms) @ self.matrix.T
+        k = min(top_k, len(self.ids))
+
+        if k < len(self.ids):
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(len(self.ids)), (len(queries), k))
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for row, candidates in zip(scores, top):
+            order = candidates[np.argsort(-row[candidates])]
+            result["ids"].append([self.ids[i] for i in order])
+            result["documents"].append([self.documents[i] for i in order])
+            result["metadatas"].append([self.metadatas[i] for i in order])
+            # Cosine distance, as reported by the "cosine" HNSW space
+            result["distances"].append((1.0 - row[order]).tolist())
+
+        return result
+
+
+class EmbeddingMatrixCache:
+    """
+    Byte-bounded LRU of FileMatrix entries keyed by (user_id, file_id).
+
+    Small files are loaded from Chroma on their first query and searched
+    exactly in memory afterwards; files above max_chunks are remembered as
+    oversized (up to max_oversized of them) so callers go straight to the
+    ANN index. The cache lives in one process. Local changes invalidate it
+    directly; entries older than revalidate_after seconds are checked
+    against the file's revision marker in Chroma (one lookup by id, bumped
+    by every write through chroma_ops) before use, which catches changes
+    made by other workers, bulk_ingest and vector_transfer.
+    """
+
+    def __init__(self, max_bytes: int, max_chunks: int, revalidate_after: float = 5.0, max_oversized: int = 10000):
+        self.max_bytes = max_bytes
+        self.max_chunks = max_chunks
+        self.revalidate_after = revalidate_after
+        self.max_oversized = max_oversized
+        self._entries: OrderedDict[tuple, FileMatrix] = OrderedDict()
+        # Keys of oversized files, least recently used first
+        self._oversized: OrderedDict[tuple, None] = OrderedDict()
+        # Bumped on every invalidation so a load racing with one is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.oversized = 0
+        self.evictions = 0
+
+    def get(self, chroma_client, user_id: str, file_id: str) -> FileMatrix | None:
+        """
+        The file's matrix, loading it on a miss. None when the file is too
+        large for exact search or has no chunks.
+        """
+        key = (user_id, file_id)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            found_oversized = key in self._oversized
+            generation = self._generation
+
+        if entry is not None and now - entry.checked_at > self.revalidate_after:
+            if get_file_revision(chroma_client, file_id, user_id) == entry.revision:
+                entry.checked_at = now
+            else:
+                self._drop(key, entry)
+                entry = None
+
+        if entry is not None:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            CACHE_REQUESTS.labels(CACHE_NAME, "hit").inc()
+            return entry
+
+        if found_oversized:
+            # Always answered from Chroma, so never stale; only the LRU order matters
+            with self._lock:
+                if key in self._oversized:
+                    self._oversized.move_to_end(key)
+                self.oversized += 1
+            CACHE_REQUESTS.labels(CACHE_NAME, "oversized").inc()
+            return None
+
+        with self._lock:
+            self.misses += 1
+        CACHE_REQUESTS.labels(CACHE_NAME, "miss").inc()
+        return self._load(chroma_client, key, generation)
+
+    def _drop(self, key: tuple, entry: FileMatrix) -> None:
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+                self.bytes -= entry.nbytes
+
+    def _load(self, chroma_client, key: tuple, generation: int) -> FileMatrix | None:
+        user_id, file_id = key
+
+        # Read before the chunks, so a write in between only costs a reload
+        revision = get_file_revision(chroma_client, file_id, user_id)
+        created = revision is None
+        if created:
+            # Chunks stored before revision markers existed
+            revision = touch_file_revision(chroma_client, file_id, user_id)
+
+        # One scan; a result above max_chunks only tells that the file is too large
+        with stage_timer("matrix_load"), span("embedding_cache.load", file_id=file_id):
+            items = get_file_embeddings(chroma_client, file_id, user_id, limit=self.max_chunks + 1)
+        count = len(items["ids"])
+
+        if count == 0:
+            if created:
+                drop_file_revision(chroma_client, file_id, user_id)
+            return None
+
+        if count > self.max_chunks:
+            with self._lock:
+                if self._generation == generation:
+                    self._oversized[key] = None
+                    self._oversized.move_to_end(key)
+                    while len(self._oversized) > self.max_oversized:
+                        self._oversized.popitem(last=False)
+            return None
+
+        entry = FileMatrix(items["ids"], items["embeddings"], items["documents"], items["metadatas"])
+        entry.revision = revision
+        entry.checked_at = time.monotonic()
+
+        if entry.nbytes > self.max_bytes:
+            return entry
+
+        with self._lock:
+            if self._generation != generation:
+                # Invalidated while loading: serve this query, keep nothing
+                return entry
+
+            self._oversized.pop(key, None)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes
+
+            self._entries[key] = entry
+            self.bytes += entry.nbytes
+
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+
+        logger.debug("Cached %d chunks of %s (%d bytes).", count, file_id, entry.nbytes)
+        return entry
+
+    def invalidate(self, user_id: str, file_id: str) -> None:
+        """Drops a file's entry; call after its chunks were changed or deleted."""
+        key = (user_id, file_id)
+
+        with self._lock:
+            self._generation += 1
+            self._oversized.pop(key, None)
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry.nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "oversized": self.oversized,
+                "oversized_files": len(self._oversized),
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+embedding_cache = EmbeddingMatrixCache(
+    max_bytes=settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+    max_chunks=settings.EMBEDDING_CACHE_MAX_CHUNKS,
+    revalidate_after=settings.EMBEDDING_CACHE_REVALIDATE_SECONDS,
+    max_oversized=settings.EMBEDDING_CACHE_MAX_OVERSIZED,
+)
@@ -1,122 +1,440 @@
+import asyncio
+import logging
+import math
 import os
 import tempfile
 import uuid
 
-from .chroma_ops import add_embeddings, query_similar_chunks
+from .admission import admission_controller
+from ..core.config import settings
+from .answer_cache import answer_cache
+from .answer_router import choose_tier, select_relevant
+from ..metrics import CHUNKS, IN_FLIGHT, LLM_ANSWERS, stage_timer
+from ..providers import get_embedding_provider
+from ..providers.resilience import UpstreamUnavailable
+from ..tracing import span
+from .chroma_ops import (
+    add_embeddings,
+    delete_chunks,
+    delete_file_chunks,
+    get_embedding_collection,
+    get_file_chunks,
+    query_similar_chunks,
+    query_similar_chunks_batch,
+    touch_file_revision,
+    update_chunk_metadatas,
+)
+from .embedding_cache import embedding_cache
 from ..utils.chunker import chunk_with_token_safety
-from ..utils.embedder import embed_chunks, embed_query
+from ..utils.embedder import BATCH_SIZE, embed_chunks, embed_queries, embed_query
+from ..utils.generate_hash import fingerprint_text
 from ..utils.pdf_reader import extract_clean_markdown
-from ..utils.generate_answer import generate_answer
+from ..utils.generate_answer import NOT_FOUND_ANSWER, generate_answer_with_usage
+
+logger = logging.getLogger(__name__)
+
+
+def extract_pages(pdf_path: str) -> list:
+    """Extracts and cleans every page, adding a fingerprint of its cleaned text."""
+    cleaned_pages = extract_clean_markdown(pdf_path)
+
+    for page in cleaned_pages:
+        page["page_hash"] = fingerprint_text(page["text"])
+
+    return cleaned_pages
+
+
+def chunk_max_tokens() -> int:
+    """CHUNK_MAX_TOKENS, capped at what the embedding model reads before truncating."""
+    limit = get_embedding_provider().max_input_tokens
+    return min(settings.CHUNK_MAX_TOKENS, limit) if limit else settings.CHUNK_MAX_TOKENS
+
+
+def chunk_pages(pages: list) -> list:
+    """Splits cleaned pages into token-safe chunks."""
+    with stage_timer("chunk"), span("chunk", pages=len(pages)) as s:
+        chunks = chunk_with_token_safety(
+            pages, model=get_embedding_provider().model_id, max_tokens=chunk_max_tokens(),
+            chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP
+        )
+        s.set("chunks", len(chunks))
+    CHUNKS.inc(len(chunks))
+    return chunks
+
+
+def chunk_metadatas(file_id: str, user_id: str, pages: list, chunks: list) -> list:
+    """Chroma metadata of each chunk; page_hash drives incremental re-ingestion."""
+    page_hashes = {p["page_number"]: p["page_hash"] for p in pages}
+
+    return [
+        {
+            "file_id": file_id,
+            "user_id": user_id,
+            "chunk_id": c["chunk_id"],
+            "page_number": c["page_number"],
+            "page_hash": page_hashes[c["page_number"]],
+        }
+        for c in chunks
+    ]
 
 
 class RAG_PIPLINE:
     def __init__(self, user_id: str, chroma_client):
         self.user_id = user_id
         self.chroma = chroma_client
-        self.collection = self.chroma.get_or_create_collection(
-            name="pdf_embeddings",
-            metadata={"hnsw:space": "cosine"}
-        )
+        self.collection = get_embedding_collection(self.chroma)
 
     async def process_pdf(self, file_bytes: bytes, filename: str) -> dict:
+        """Ingests a PDF through the low-priority "ingest" admission class."""
+        with IN_FLIGHT.labels("ingest").track_inprogress(), span("rag.process_pdf", **{"file.bytes": len(file_bytes)}):
+            return await admission_controller.run("ingest", self._process_pdf, file_bytes, filename)
 
-        file_id = str(uuid.uuid4())
+    async def query_and_answer_pdf(self, file_id: str, question: str, top_k: int = 5) -> dict:
+        """Answers a question through the high-priority "query" admission class."""
+        with IN_FLIGHT.labels("query").track_inprogress(), span("rag.query", file_id=file_id, top_k=top_k):
+            return await admission_controller.run(
+                "query", self._query_and_answer_pdf, file_id, question, top_k
+            )
 
+    async def update_pdf(self, file_id: str, file_bytes: bytes, filename: str) -> dict:
+        """Re-ingests a revised PDF in place through the "ingest" admission class."""
+        with IN_FLIGHT.labels("ingest").track_inprogress(), span("rag.update_pdf", file_id=file_id, **{"file.bytes": len(file_bytes)}):
+            return await admission_controller.run("ingest", self._update_pdf, file_id, file_bytes, filename)
+
+    async def delete_pdf(self, file_id: str) -> int:
+        """Deletes every chunk of a file through the "ingest" admission class."""
+        with span("rag.delete_pdf", file_id=file_id):
+            return await admission_controller.run("ingest", self._delete_pdf, file_id)
+
+    def _extract_pages(self, file_bytes: bytes, filename: str, file_id: str) -> list:
+        """Writes the upload to a temporary file and extracts its pages."""
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
             temp_pdf.write(file_bytes)
             temp_pdf_path = temp_pdf.name
 
         try:
-            # 1. Extract and Chunk Text
-            print("Extracting and chunking PDF...")
-            cleaned_pages = extract_clean_markdown(temp_pdf_path)
-            
-            print(f"Extracted {len(cleaned_pages)} pages from PDF.")
-
-            chunks = chunk_with_token_safety(
-                cleaned_pages, model="gemini-embedding-001", max_tokens=800, 
-                chunk_size=1200, chunk_overlap=200
-            )
-            chunk_texts = [c["text"] for c in chunks]
-            
-            print(f"Chunked into {len(chunk_texts)} pieces.")
-            # 2. Embed and Prepare Metadata
-            embeddings = embed_chunks(chunk_texts) 
-            ids = [c["chunk_id"] for c in chunks]
-            
-            metadatas = [
-                {
-                    "file_id": file_id,
-                    "user_id": self.user_id,
-                    "chunk_id": c["chunk_id"],
-                    "page_number": c["page_number"],
-                }
-                for c in chunks
-            ]
-
-            print("Embeddings generated.")
-            stored_count = add_embeddings(
-                chroma_client=self.chroma,
-                chunks=chunk_texts, 
-                embeddings=embeddings, 
-                ids=ids, 
-                metadatas=metadatas
-            )
-
-            print(f"Stored {stored_count} embeddings in Chroma.")
-            # 4. Return results for the Controller to format
-            return {
-                "file_id": file_id,
-                "stored_count": stored_count,
-                "total_chunks": len(chunks)
-            }
+            logger.info("Extracting PDF %s as %s", filename, file_id)
+            with span("extract_clean", file_id=file_id) as s:
+                cleaned_pages = extract_pages(temp_pdf_path)
+                s.set("pages", len(cleaned_pages))
         finally:
             os.remove(temp_pdf_path)
 
+        logger.info("Extracted %d pages from PDF.", len(cleaned_pages))
+        return cleaned_pages
 
-    async def query_and_answer_pdf(self, file_id: str, question: str, top_k: int = 5) -> dict:
-        # 1️⃣ Embed the query
-        query_vec = embed_query(question)
+    def _embed_and_store(self, file_id: str, pages: list) -> tuple[int, int]:
+        """Chunks, embeds and stores the given pages. Returns (stored_count, embed_calls)."""
+        chunks = chunk_pages(pages)
+
+        if not chunks:
+            return 0, 0
+
+        chunk_texts = [c["text"] for c in chunks]
+        logger.info("Chunked into %d pieces.", len(chunk_texts))
+
+        # Embed and Prepare Metadata
+        embeddings = embed_chunks(chunk_texts) 
+        ids = [c["chunk_id"] for c in chunks]
+        metadatas = chunk_metadatas(file_id, self.user_id, pages, chunks)
+
+        logger.info("Embeddings generated.")
+        stored_count = add_embeddings(
+            chroma_client=self.chroma,
+            chunks=chunk_texts, 
+            embeddings=embeddings, 
+            ids=ids, 
+            metadatas=metadatas
+        )
+
+        logger.info("Stored %d embeddings in Chroma.", stored_count)
+        return stored_count, math.ceil(len(chunk_texts) / BATCH_SIZE)
+
+    def _process_pdf(self, file_bytes: bytes, filename: str) -> dict:
+
+        file_id = str(uuid.uuid4())
+
+        # 1. Extract and clean pages
+        cleaned_pages = self._extract_pages(file_bytes, filename, file_id)
+
+        # 2. Chunk, embed and store
+        stored_count, embed_calls = self._embed_and_store(file_id, cleaned_pages)
+
+        # 3. Return results for the Controller to format
+        return {
+            "file_id": file_id,
+            "stored_count": stored_count,
+            "total_chunks": stored_count,
+            "total_pages": len(cleaned_pages),
+            "embed_calls": embed_calls
+        }
+
+    def _update_pdf(self, file_id: str, file_bytes: bytes, filename: str) -> dict:
+        """
+        Diffs page fingerprints of the new revision against the stored ones.
+        Unchanged pages keep their vectors, pages that only moved get their
+        page_number rewritten, and only new/changed pages are re-embedded.
+        """
+        stored = get_file_chunks(self.chroma, file_id, self.user_id)
+        if not stored["ids"]:
+            raise ValueError("File not found for this user.")
+
+        # Group stored chunks per page: page_hash -> {page_number: [chunk ids]}
+        stored_pages = {}
+        for chunk_id, meta in zip(stored["ids"], stored["metadatas"]):
+            page_key = meta.get("page_hash")
+            stored_pages.setdefault(page_key, {}).setdefault(meta["page_number"], []).append(chunk_id)
+
+        new_pages = self._extract_pages(file_bytes, filename, file_id)
+
+        changed, moved_ids, moved_meta = [], [], []
+        unchanged_count = moved_count = 0
+
+        for page in new_pages:
+            candidates = stored_pages.get(page["page_hash"]) if page["page_hash"] else None
+            if not candidates:
+                changed.append(page)
+                continue
+
+            # Prefer the same page number; otherwise reuse a moved copy
+            old_number = page["page_number"] if page["page_number"] in candidates else next(iter(candidates))
+            ids = candidates.pop(old_number)
+
+            if old_number == page["page_number"]:
+                unchanged_count += 1
+            else:
+                moved_count += 1
+                moved_ids.extend(ids)
+                moved_meta.extend({"page_number": page["page_number"]} for _ in ids)
+
+        # Whatever was not reused belongs to changed or removed pages
+        stale_ids = [cid for pages in stored_pages.values() for ids in pages.values() for cid in ids]
+        stored_page_numbers = {m["page_number"] for m in stored["metadatas"]}
+        removed_count = len(stored_page_numbers - {p["page_number"] for p in new_pages})
+
+        # Add the new vectors before dropping the old ones, so a failed
+        # embedding call leaves the previous revision queryable
+        stored_count, embed_calls = self._embed_and_store(file_id, changed)
+
+        if moved_ids:
+            update_chunk_metadatas(self.chroma, moved_ids, moved_meta)
+
+        deleted_count = delete_chunks(self.chroma, stale_ids)
+        if moved_ids or stale_ids:
+            # Moves and deletes go by chunk id, so the revision is bumped here
+            touch_file_revision(self.chroma, file_id, self.user_id)
+        embedding_cache.invalidate(self.user_id, file_id)
+        answer_cache.invalidate_file(self.user_id, file_id)
+
+        logger.info(
+            "Updated %s: %d unchanged, %d moved, %d changed, %d removed pages.",
+            file_id, unchanged_count, moved_count, len(changed), removed_count
+        )
+
+        return {
+            "file_id": file_id,
+            "total_pages": len(new_pages),
+            "unchanged_pages": unchanged_count,
+            "moved_pages": moved_count,
+            "changed_pages": len(changed),
+            "removed_pages": removed_count,
+            "stored_count": stored_count,
+            "deleted_count": deleted_count,
+            "embed_calls": embed_calls
+        }
+
+    def _delete_pdf(self, file_id: str) -> int:
+        deleted_count = delete_file_chunks(file_id, self.chroma, user_id=self.user_id)
+        embedding_cache.invalidate(self.user_id, file_id)
+        answer_cache.invalidate_file(self.user_id, file_id)
+
+        if not deleted_count:
+            raise ValueError("File not found for this user.")
+
+        logger.info("Deleted %d chunks of %s.", deleted_count, file_id)
+        return deleted_count
+
+    def _search(self, file_id: str, query_vecs: list, top_k: int) -> dict | None:
+        """
+        Exact in-memory search when the file's matrix fits the cache,
+        a filtered ANN query against Chroma otherwise.
+        """
+        matrix = embedding_cache.get(self.chroma, self.user_id, file_id)
+        if matrix is not None:
+            with stage_timer("matrix_search"), span("matrix.search", queries=len(query_vecs), top_k=top_k):
+                return matrix.search(query_vecs, top_k)
 
-        # 2️⃣ Search Chroma using BOTH filters
         # We must pass self.user_id for security and file_id for file context
-        res = query_similar_chunks(
+        if len(query_vecs) == 1:
+            return query_similar_chunks(
+                chroma_client=self.chroma,
+                user_id=self.user_id,
+                file_id=file_id,
+                query_embedding=query_vecs[0],
+                top_k=top_k
+            )
+
+        return query_similar_chunks_batch(
             chroma_client=self.chroma,
-            user_id=self.user_id, 
-            file_id=file_id, 
-            query_embedding=query_vec, 
+            user_id=self.user_id,
+            file_id=file_id,
+            query_embeddings=query_vecs,
             top_k=top_k
         )
 
+    def _cached_answer(self, file_id: str, question: str, top_k: int) -> dict | None:
+        """A previous answer to the same question, marked as cached and free of usage."""
+        result = answer_cache.get(self.user_id, file_id, question, top_k)
+        if result is None:
+            return None
+
+        logger.info("Upstream unavailable, serving cached answer for %s.", file_id)
+        result["cached"] = True
+        result["usage"] = {"prompt_tokens": 0, "output_tokens": 0, "embed_calls": 0}
+        return result
+
+    def _query_and_answer_pdf(self, file_id: str, question: str, top_k: int = 5) -> dict:
+        try:
+            return self._retrieve_and_answer(file_id, question, top_k)
+        except UpstreamUnavailable:
+            # Circuit open or deadline missed: fall back to the last answer if there is one
+            cached = self._cached_answer(file_id, question, top_k)
+            if cached is None:
+                raise
+            return cached
+
+    def _retrieve_and_answer(self, file_id: str, question: str, top_k: int) -> dict:
+        # 1️⃣ Embed the query
+        query_vec = embed_query(question)
+
+        # 2️⃣ Search the file's chunks (cached matrix or Chroma, both filtered by user)
+        res = self._search(file_id, [query_vec], top_k)
+
         if not res or not res.get("documents") or not res["documents"][0]:
             # Raise a standard Python exception (Service should not raise HTTPException)
             raise ValueError("No relevant content found for this file and user.")
 
-        # 3️⃣ Extract and Sort Context
-        docs = res["documents"][0]
-        metadatas = res.get("metadatas", [[]])[0]
+        result = self._answer_from_chunks(
+            file_id, question, res["documents"][0], res.get("metadatas", [[]])[0], top_k,
+            (res.get("distances") or [[]])[0]
+        )
+        result["usage"]["embed_calls"] = 1
+        return result
+
+    def _answer_from_chunks(
+        self, file_id: str, question: str, docs: list, metadatas: list, top_k: int, distances: list | None = None
+    ) -> dict:
+        # 3️⃣ Drop weakly related chunks, then sort the rest by page_number
+        docs, metadatas, distances = select_relevant(
+            docs[:top_k], metadatas[:top_k], distances[:top_k] if distances else None
+        )
 
-        # Sort chunks by page_number 
         combined = list(zip(docs, metadatas))
         combined.sort(key=lambda x: x[1].get("page_number", 0))
 
         sorted_docs = [x[0] for x in combined]
         sorted_meta = [x[1] for x in combined]
 
-        # 4️⃣ Limit Context & Ask LLM
-        safe_context = "\n\n".join(sorted_docs[:top_k])
+        # 4️⃣ Ask the LLM tier that fits the context (none if nothing is relevant)
+        safe_context = "\n\n".join(sorted_docs)
 
-        answer = generate_answer(
-            question=question,
-            context=safe_context
-        )
+        if not sorted_docs:
+            tier = "none"
+            answer, usage = NOT_FOUND_ANSWER, {"prompt_tokens": 0, "output_tokens": 0}
+        else:
+            tier = choose_tier(safe_context, distances)
+            with span("generate", chunks=len(sorted_docs), tier=tier) as s:
+                answer, usage = generate_answer_with_usage(
+                    question=question,
+                    context=safe_context,
+                    tier=tier
+                )
+                s.set("prompt_tokens", usage["prompt_tokens"])
+                s.set("output_tokens", usage["output_tokens"])
+        usage["embed_calls"] = 0
+        LLM_ANSWERS.labels(tier).inc()
 
         # 5️⃣ Return structured data (Service's output)
-        return {
+        result = {
             "file_id": file_id,
             "question": question,
             "answer": answer,
-            "chunks_used": sorted_docs[:top_k],
-            "metadatas_used": sorted_meta[:top_k],
-            "top_k": top_k
-        }
\ No newline at end of file
+            "chunks_used": sorted_docs,
+            "metadatas_used": sorted_meta,
+            "top_k": top_k,
+            "model_tier": tier,
+            "usage": usage
+        }
+        answer_cache.put(self.user_id, file_id, question, top_k, result)
+        return result
+
+    def _retrieve_batch(self, file_id: str, questions: list[str], top_k: int) -> tuple[list, list, list, int]:
+        """Embeds all questions together and runs one multi-vector search."""
+        query_vecs = embed_queries(questions)
+
+        res = self._search(file_id, query_vecs, top_k)
+
+        documents = res.get("documents") or [[] for _ in questions]
+        metadatas = res.get("metadatas") or [[] for _ in questions]
+        distances = res.get("distances") or [[] for _ in questions]
+
+        if not any(documents):
+            raise ValueError("No relevant content found for this file and user.")
+
+        return documents, metadatas, distances, math.ceil(len(questions) / BATCH_SIZE)
+
+    async def answer_batch(self, file_id: str, questions: list[str], top_k: int = 5, concurrency: int = 4):
+        """
+        Answers many questions about one file. Retrieval is shared (one
+        embedding pass, one Chroma query) and happens before this returns,
+        so "not found" and admission errors surface as normal exceptions.
+        Returns (answers, embed_calls): an async generator of answers in
+        completion order, each tagged with the index of its question and
+        ending with a summary item, and the embedding calls already made.
+        """
+        with span("rag.retrieve_batch", file_id=file_id, questions=len(questions), top_k=top_k):
+            documents, metadatas, distances, embed_calls = await admission_controller.run(
+                "batch", self._retrieve_batch, file_id, questions, top_k
+            )
+
+        answers = self._stream_batch_answers(
+            file_id, questions, documents, metadatas, distances, embed_calls, top_k, concurrency
+        )
+        return answers, embed_calls
+
+    async def _stream_batch_answers(self, file_id, questions, documents, metadatas, distances, embed_calls, top_k, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def answer(index: int):
+            async with semaphore:
+                try:
+                    if not documents[index]:
+                        raise ValueError("No relevant content found for this question.")
+                    result = await admission_controller.run(
+                        "batch", self._answer_from_chunks,
+                        file_id, questions[index], documents[index], metadatas[index], top_k, distances[index]
+                    )
+                    return {"index": index, **result}
+                except UpstreamUnavailable as e:
+                    cached = self._cached_answer(file_id, questions[index], top_k)
+                    if cached is not None:
+                        return {"index": index, **cached}
+                    logger.warning("Batch question %d failed: %s", index, e)
+                    return {"index": index, "question": questions[index], "error": str(e)}
+                except Exception as e:
+                    logger.warning("Batch question %d failed: %s", index, e)
+                    return {"index": index, "question": questions[index], "error": str(e)}
+
+        tasks = [asyncio.create_task(answer(i)) for i in range(len(questions))]
+        errors = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                errors += "error" in item
+                yield item
+        finally:
+            # Client went away: stop generating answers nobody will read
+            for task in tasks:
+                task.cancel()
+
+        yield {"done": True, "answered": len(questions) - errors, "errors": errors, "embed_calls": embed_calls}
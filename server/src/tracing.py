@@ -0,0 +1,231 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+
+from .core.config import settings
+
+logger = logging.getLogger(__name__)
+
+request_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("request_id", default=None)
+current_span_var: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; nests under the span active when it was opened."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_otlp(self) -> dict:
+        """OTLP/JSON span representation."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    def set(self, key: str, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class SpanExporter:
+    """
+    Batches finished spans on a background thread so request handlers
+    never wait on file or network I/O. Spans are dropped when the
+    queue is full rather than applying back-pressure.
+    """
+
+    def __init__(self, kind: str, path: str, endpoint: str, max_queue: int = 10000, flush_interval: float = 1.0):
+        self.kind = kind
+        self.path = path
+        self.max_bytes = settings.TRACE_FILE_MAX_MB * 1024 * 1024
+        self.endpoint = endpoint
+        self.flush_interval = flush_interval
+        self.queue: queue.Queue[Span | None] = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._worker, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self):
+        self.queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _worker(self):
+        stop = False
+        while not stop:
+            batch = []
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= 512:
+                        break
+                    item = self.queue.get_nowait()
+                else:
+                    stop = True
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    self._export(batch)
+                except Exception as e:
+                    logger.warning("Span export failed: %s", e)
+
+    def _export(self, batch: list[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", settings.SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "src.tracing"},
+                    "spans": [s.to_otlp() for s in batch],
+                }],
+            }]
+        }
+
+        if self.kind == "otlp":
+            req = urllib.request.Request(
+                self.endpoint,
+                data=json.dumps(payload).encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            urllib.request.urlopen(req, timeout=5).close()
+        else:
+            # One OTLP/JSON document per line; can be replayed into a collector
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload) + "\n")
+
+
+exporter: SpanExporter | None = None
+
+
+def configure_tracing():
+    """Starts the span exporter selected by TRACE_EXPORTER (none, file or otlp)."""
+    global exporter
+
+    if exporter is not None or settings.TRACE_EXPORTER == "none":
+        return
+
+    path = settings.TRACE_FILE
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    exporter = SpanExporter(settings.TRACE_EXPORTER, path, settings.OTLP_ENDPOINT)
+    atexit.register(exporter.shutdown)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Opens a child span of the current one. A no-op when tracing is off,
+    so instrumented code costs next to nothing by default.
+    """
+    if exporter is None:
+        yield _NOOP_SPAN
+        return
+
+    parent = current_span_var.get()
+    if parent is None and request_id_var.get():
+        attributes.setdefault("request.id", request_id_var.get())
+
+    s = Span(name, parent, attributes)
+    token = current_span_var.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current_span_var.reset(token)
+        s.end_ns = time.time_ns()
+        exporter.submit(s)
+
+
+class RequestTracingMiddleware:
+    """
+    ASGI middleware: assigns each request an id (X-Request-ID is honoured
+    if the client sent one), echoes it on the response and wraps the
+    request in a root span.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for key, value in scope.get("headers", []):
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+                root.set("http.status_code", message["status"])
+            await send(message)
+
+        try:
+            with span(f"{scope['method']} {scope['path']}", **{"http.method": scope["method"], "http.target": scope["path"]}) as root:
+                await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -1,9 +1,10 @@
+import logging
 import uuid
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from google import genai
 from ..core.config import settings
+from ..providers import get_embedding_provider
+from ..providers.resilience import resilient
 
-client = genai.Client(api_key=settings.GENAI_API_KEY)  # GENAI_API_KEY must be set
+logger = logging.getLogger(__name__)
 
 
 # --- Approximate tokens BEFORE calling Gemini ---
@@ -13,10 +14,11 @@ def approx_token_count(text: str) -> int:
 
 # --- Exact count ONLY when necessary ---
 def exact_token_count(text: str, model: str) -> int:
-    return client.models.count_tokens(
-        model=model,
-        contents=text
-    ).total_tokens
+    # Counted by the active embedding backend's own tokenizer
+    return resilient.call(
+        "embed", "count_tokens", get_embedding_provider().count_tokens, text,
+        deadline=settings.UPSTREAM_EMBED_DEADLINE_SECONDS
+    )
 
 
 def resplit_until_safe(text: str, model: str, max_tokens: int):
@@ -26,6 +28,8 @@ def resplit_until_safe(text: str, model: str, max_tokens: int):
     """
     safe_chunks = []
 
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=600,
         chunk_overlap=120,
@@ -79,6 +83,8 @@ def chunk_with_token_safety(
       - Exact Gemini check only if needed (OPTIMIZED)
     """
 
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
@@ -136,5 +142,5 @@ def chunk_with_token_safety(
                 "token_count": token_count
             })
 
-    print(f"✅ Created {len(final_chunks)} final chunks.")
+    logger.info("Created %d final chunks.", len(final_chunks))
     return final_chunks
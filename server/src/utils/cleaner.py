@@ -1,6 +1,5 @@
 import re
 import unicodedata
-import fitz  # PyMuPDF
 
 def clean_md(md: str):
     md = md.replace("\r\n", "\n")
@@ -63,6 +62,8 @@ def clean_md(md: str):
 
 
 def detect_headers_footers(pdf_path, threshold=0.5):
+    import fitz  # PyMuPDF, imported on first use to keep startup fast
+
     doc = fitz.open(pdf_path)
     header_counts = {}
     footer_counts = {}
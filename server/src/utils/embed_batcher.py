@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import Future
+
+from ..metrics import EMBED_BATCH_SIZE
+
+
+class _Batch:
+    def __init__(self):
+        self.texts: list[str] = []
+        self.waiters: list[tuple[Future, int, int]] = []
+        self.closed = threading.Event()
+
+    def add(self, texts: list[str]) -> Future:
+        future = Future()
+        start = len(self.texts)
+        self.texts.extend(texts)
+        self.waiters.append((future, start, len(self.texts)))
+        return future
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces embedding requests from concurrent callers into shared
+    upstream calls, one open batch per task type.
+
+    Callers are pipeline worker threads. The first caller to find no open
+    batch becomes its leader: it waits up to `window` seconds (less if the
+    batch fills up to `max_batch` texts), makes the single upstream call
+    and scatters the vectors back to every caller that joined. Requests
+    that already fill a batch on their own skip the wait.
+    """
+
+    def __init__(self, call, max_batch: int, window: float):
+        # call(task_type, texts) -> vectors, in the same order as texts
+        self._call = call
+        self.max_batch = max_batch
+        self.window = window
+        self._open: dict[str, _Batch] = {}
+        self._lock = threading.Lock()
+
+    def embed(self, task_type: str, texts: list[str]) -> list:
+        if not texts:
+            return []
+
+        if self.window <= 0 or len(texts) >= self.max_batch:
+            EMBED_BATCH_SIZE.labels(task_type).observe(len(texts))
+            return self._call(task_type, texts)
+
+        with self._lock:
+            batch = self._open.get(task_type)
+            leader = batch is None or len(batch.texts) + len(texts) > self.max_batch
+            if leader:
+                if batch is not None:
+                    # No room left: flush the current batch now, start a new one
+                    batch.closed.set()
+                batch = self._open[task_type] = _Batch()
+
+            future = batch.add(texts)
+            if len(batch.texts) >= self.max_batch:
+                batch.closed.set()
+
+        if leader:
+            self._lead(task_type, batch)
+
+        return future.result()
+
+    def _lead(self, task_type: str, batch: _Batch) -> None:
+        batch.closed.wait(self.window)
+
+        with self._lock:
+            if self._open.get(task_type) is batch:
+                del self._open[task_type]
+
+        EMBED_BATCH_SIZE.labels(task_type).observe(len(batch.texts))
+
+        try:
+            vectors = self._call(task_type, batch.texts)
+        except BaseException as e:
+            for future, _, _ in batch.waiters:
+                future.set_exception(e)
+            return
+
+        for future, start, end in batch.waiters:
+            future.set_result(vectors[start:end])
@@ -1,49 +1,73 @@
-from google import genai
-from google.genai import types
+import logging
 import time
 from ..core.config import settings
+from ..metrics import EMBED_RETRIES, stage_timer
+from ..providers import get_embedding_provider
+from ..providers.resilience import CircuitOpen, UpstreamUnavailable, resilient
+from ..tracing import span
+from ..utils.embed_batcher import EmbeddingBatcher
 from ..utils.normalize_vector import normalize
 
-client = genai.Client(api_key=settings.GENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
-MODEL_NAME = "gemini-embedding-001"
 BATCH_SIZE = 96  
 
 
+def _embed_call(task_type: str, texts: list[str]):
+    """
+    One upstream embedding call. Embedding calls are idempotent, so they
+    get hedged as well as a deadline.
+    """
+    provider = get_embedding_provider()
+    if task_type == "RETRIEVAL_QUERY":
+        call, func = "embed_queries", provider.embed_queries
+    else:
+        call, func = "embed_documents", provider.embed_documents
+
+    return resilient.call(
+        "embed", call, func, texts,
+        deadline=settings.UPSTREAM_EMBED_DEADLINE_SECONDS, hedge=True
+    )
+
+
+# Concurrent queries and small uploads share upstream calls: requests that
+# arrive within EMBED_BATCH_WINDOW_MS are sent together, up to BATCH_SIZE texts
+batcher = EmbeddingBatcher(_embed_call, max_batch=BATCH_SIZE, window=settings.EMBED_BATCH_WINDOW_MS / 1000)
+
+
 def embed_chunks(chunks: list[str], batch_size: int = BATCH_SIZE):
+    provider = get_embedding_provider()
     all_embeddings = []
 
     for i in range(0, len(chunks), batch_size):
         batch = chunks[i : i + batch_size]
 
-        content_list = [
-            types.Content(parts=[types.Part(text=chunk)])
-            for chunk in batch
-        ]
-
         for attempt in range(3):
-            try:
-                response = client.models.embed_content(
-                    model=MODEL_NAME,
-                    contents=content_list,
-                    config=types.EmbedContentConfig(task_type="RETRIEVAL_DOCUMENT", output_dimensionality=1536)
+            if attempt:
+                EMBED_RETRIES.labels("embed_documents").inc()
 
-                )   
+            try:
+                with stage_timer("embed_batch"), span(f"{provider.name}.embed_content", batch_size=len(batch), attempt=attempt + 1):
+                    vectors = batcher.embed("RETRIEVAL_DOCUMENT", batch)
 
-                normalized_vectors = [normalize(emb.values) for emb in response.embeddings]
+                normalized_vectors = [normalize(v) for v in vectors]
 
                 all_embeddings.extend(normalized_vectors)
 
                 break
 
             except Exception as e:
-                print(f"⚠ Gemini embed failed (attempt {attempt+1}/3): {e}")
-                time.sleep(1 + attempt * 1)
+                # No point retrying into an open breaker; keep the type so callers can answer 503
+                if isinstance(e, CircuitOpen) or (attempt == 2 and isinstance(e, UpstreamUnavailable)):
+                    raise
+                logger.warning("%s embed failed (attempt %d/3): %s", provider.name, attempt + 1, e)
+                if attempt < 2:
+                    time.sleep(1 + attempt * 1)
 
         else:
-            raise RuntimeError("Gemini embedding failed after 3 retries.")
+            raise RuntimeError(f"{provider.name} embedding failed after 3 retries.")
 
-    print(f"✅ Embedded {len(chunks)} chunks into {len(all_embeddings)} embeddings.")
+    logger.info("Embedded %d chunks into %d embeddings.", len(chunks), len(all_embeddings))
     return all_embeddings
 
 
@@ -51,17 +75,22 @@ def embed_chunks(chunks: list[str], batch_size: int = BATCH_SIZE):
 def embed_query(text: str):
     """Embed a single query text for RAG."""
     text = text.strip()
+    provider = get_embedding_provider()
 
-    content = types.Content(parts=[types.Part(text=text)])
+    with stage_timer("embed_query"), span(f"{provider.name}.embed_query"):
+        vector = batcher.embed("RETRIEVAL_QUERY", [text])[0]
+
+    return normalize(vector)
 
-    response = client.models.embed_content(
-        model=MODEL_NAME,   
-        contents=[content],
-        config=types.EmbedContentConfig(task_type="RETRIEVAL_QUERY", output_dimensionality=1536)
-    )
 
+def embed_queries(texts: list[str], batch_size: int = BATCH_SIZE):
+    """Embed many query texts with as few provider calls as possible."""
+    provider = get_embedding_provider()
+    vectors = []
 
-    if not response.embeddings:
-        raise RuntimeError("No embedding returned from Gemini.")
+    for i in range(0, len(texts), batch_size):
+        batch = [t.strip() for t in texts[i : i + batch_size]]
+        with stage_timer("embed_query"), span(f"{provider.name}.embed_queries", batch_size=len(batch)):
+            vectors.extend(normalize(v) for v in batcher.embed("RETRIEVAL_QUERY", batch))
 
-    return normalize(response.embeddings[0].values)
+    return vectors
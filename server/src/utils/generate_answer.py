@@ -1,17 +1,25 @@
-from google import genai
 from ..core.config import settings
+from ..metrics import LLM_TIER_LATENCY, LLM_TIER_TOKENS, TOKENS, stage_timer
+from ..providers import get_llm_provider
+from ..providers.resilience import resilient
+from ..tracing import span
+from ..utils.chunker import approx_token_count
 
-client = genai.Client(api_key=settings.GENAI_API_KEY)
+NOT_FOUND_ANSWER = "I cannot find the answer in the document."
 
 
-def generate_answer(question: str, context: str):
+def generate_answer_with_usage(question: str, context: str, tier: str = "default"):
+    """
+    Returns (answer_text, usage) where usage holds prompt/output token counts.
+    `tier` picks the model: "default" (LLM_MODEL) or "fast" (LLM_MODEL_FAST).
+    """
     prompt = f"""
 You are a factual RAG question-answering assistant.
 
 You MUST answer strictly and only from the provided context.
 
 If the answer is not present in the context,
-respond exactly with: "I cannot find the answer in the document."
+respond exactly with: "{NOT_FOUND_ANSWER}"
 
 ---
 
@@ -24,16 +32,29 @@ QUESTION:
 {question}
 """
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=[
-            {
-                "role": "user",
-                "parts": [
-                    {"text": prompt}
-                ]
-            }
-        ]
-    )
-
-    return response.text
+    provider = get_llm_provider(tier)
+
+    with stage_timer("llm_generate"), LLM_TIER_LATENCY.labels(tier).time(), \
+            span(f"{provider.name}.generate_content", model=provider.model, tier=tier):
+        # Generation is not hedged: a duplicate would double the token cost
+        answer, reported = resilient.call(
+            "generate", "generate", provider.generate, prompt,
+            deadline=settings.UPSTREAM_GENERATE_DEADLINE_SECONDS
+        )
+
+    usage = {
+        "prompt_tokens": reported.get("prompt_tokens") or approx_token_count(prompt),
+        "output_tokens": reported.get("output_tokens") or approx_token_count(answer or ""),
+    }
+
+    TOKENS.labels("prompt").inc(usage["prompt_tokens"])
+    TOKENS.labels("output").inc(usage["output_tokens"])
+    LLM_TIER_TOKENS.labels(tier, "prompt").inc(usage["prompt_tokens"])
+    LLM_TIER_TOKENS.labels(tier, "output").inc(usage["output_tokens"])
+
+    return answer, usage
+
+
+def generate_answer(question: str, context: str):
+    answer, _ = generate_answer_with_usage(question, context)
+    return answer
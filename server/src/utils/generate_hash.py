@@ -1,11 +1,92 @@
+import asyncio
+import hashlib
+import hmac
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from pwdlib import PasswordHash
 
+from ..core.config import settings
+
 hash_generator = PasswordHash.recommended()
 
+# Argon2 releases the GIL, so a small thread pool keeps the event loop free
+# while capping how many CPU-heavy hashes run at the same time.
+hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+hash_semaphore = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+
+hash_pool_stats = {
+    "in_flight": 0,
+    "queued": 0,
+    "completed": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+    "run_seconds_total": 0.0,
+}
+
+
 def generate_hash(raw_string: str) -> str:
     """Hashes a plain password."""
     return hash_generator.hash(raw_string)
 
 def verify_hash(raw_string: str, hashed_string: str) -> bool:
     """Verifies a plain password against a stored hash."""
-    return hash_generator.verify(raw_string, hashed_string)
\ No newline at end of file
+    return hash_generator.verify(raw_string, hashed_string)
+
+
+async def _run_in_hash_pool(func, *args):
+    """
+    Runs a password hash function in the bounded pool and records
+    how long the call waited for a slot and how long it ran.
+    """
+    queued_at = time.perf_counter()
+    hash_pool_stats["queued"] += 1
+
+    async with hash_semaphore:
+        started_at = time.perf_counter()
+        wait = started_at - queued_at
+
+        hash_pool_stats["queued"] -= 1
+        hash_pool_stats["in_flight"] += 1
+        hash_pool_stats["wait_seconds_total"] += wait
+        hash_pool_stats["wait_seconds_max"] = max(hash_pool_stats["wait_seconds_max"], wait)
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(hash_executor, func, *args)
+        finally:
+            hash_pool_stats["in_flight"] -= 1
+            hash_pool_stats["completed"] += 1
+            hash_pool_stats["run_seconds_total"] += time.perf_counter() - started_at
+
+
+async def generate_hash_async(raw_string: str) -> str:
+    """Hashes a plain password without blocking the event loop."""
+    return await _run_in_hash_pool(generate_hash, raw_string)
+
+async def verify_hash_async(raw_string: str, hashed_string: str) -> bool:
+    """Verifies a plain password without blocking the event loop."""
+    return await _run_in_hash_pool(verify_hash, raw_string, hashed_string)
+
+
+def hash_token(token: str) -> str:
+    """
+    Keyed SHA-256 digest for high-entropy tokens (refresh tokens).
+    Deterministic, so the digest can be stored and looked up by index.
+    """
+    return hmac.new(
+        settings.SECRET_KEY.encode(),
+        token.encode(),
+        hashlib.sha256
+    ).hexdigest()
+
+def verify_token_hash(token: str, token_hash: str) -> bool:
+    """Constant-time comparison of a token against its stored digest."""
+    return hmac.compare_digest(hash_token(token), token_hash)
+
+def fingerprint_text(text: str) -> str:
+    """Content fingerprint (SHA-256) used to detect changed pages between revisions."""
+    return hashlib.sha256(text.encode()).hexdigest()
@@ -1,15 +1,22 @@
-import fitz  # PyMuPDF
+import logging
+
+from ..metrics import PAGES, stage_timer
+from ..tracing import span
 from ..utils.cleaner import clean_md, detect_headers_footers, remove_headers_footers
 
+logger = logging.getLogger(__name__)
+
 def extract_clean_markdown(pdf_path):
     """
     FAST extraction of text from PDF, cleans headers/footers,
     and returns structured pages.
     """
+    import fitz  # PyMuPDF, imported on first use to keep startup fast
 
     # 1. Detect headers and footers (uses PyMuPDF anyway)
-    headers, footers = detect_headers_footers(pdf_path)
-    print(f"Detected {len(headers)} headers, {len(footers)} footers.")
+    with stage_timer("header_footer_detect"), span("header_footer_detect"):
+        headers, footers = detect_headers_footers(pdf_path)
+    logger.info("Detected %d headers, %d footers.", len(headers), len(footers))
 
     doc = fitz.open(pdf_path)
     cleaned_pages = []
@@ -19,15 +26,17 @@ def extract_clean_markdown(pdf_path):
         page = doc[page_num]
         
         # Extract plain text (FAST)
-        text = page.get_text("text")  
+        with stage_timer("extract"):
+            text = page.get_text("text")  
 
-        # Remove headers/footers
-        if headers or footers:
-            text = remove_headers_footers(text, headers, footers)
-            print(f"Removed headers/footers from page {page_num + 1}.")
+        with stage_timer("clean"):
+            # Remove headers/footers
+            if headers or footers:
+                text = remove_headers_footers(text, headers, footers)
+                logger.debug("Removed headers/footers from page %d.", page_num + 1)
 
-        # Optional markdown cleanup if needed
-        text = clean_md(text)
+            # Optional markdown cleanup if needed
+            text = clean_md(text)
 
         cleaned_pages.append({
             "page_number": page_num + 1,
@@ -35,6 +44,7 @@ def extract_clean_markdown(pdf_path):
         })
     
     doc.close()
+    PAGES.inc(len(cleaned_pages))
 
-    print(f"Extracted & cleaned {len(cleaned_pages)} pages.")
+    logger.info("Extracted & cleaned %d pages.", len(cleaned_pages))
     return cleaned_pages
@@ -0,0 +1,211 @@
+"""
+Export and import of stored chunks with their vectors, so a customer can be
+moved between environments (or a vector store rebuilt) without calling the
+embedding API again.
+
+An export is a directory:
+  manifest.json       embedding model, dimension, counts, source user/file
+  part-00000.npz ...  one page of chunks each, columnar:
+                        embeddings  float32 (n, dim)
+                        ids / documents / metadatas
+                                    UTF-8 blob (uint8) + int64 offsets,
+                                    metadatas as one JSON object per row
+
+Export takes a sorted snapshot of the matching chunk ids, then reads
+Chroma page by page by id; import writes page by page. Apart from the
+id list, memory stays bounded by --page-size. Import refuses exports made with a
+different embedding model and can re-own the chunks with --user-id
+(which gives them new, user-derived ids).
+
+Usage (from server/):
+    python -m src.vector_transfer export --user-id <id> [--file-id <id>] ./export_dir
+    python -m src.vector_transfer import ./export_dir [--user-id <new id>]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+import uuid
+
+import numpy as np
+
+from .core.config import settings
+from .logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+# Chunk ids of chunks imported for another user derive from (user_id, original id)
+CHUNK_ID_NAMESPACE = uuid.UUID("0b4f8a6e-3c1d-4e57-9a2b-7d6c5e4f3a21")
+
+
+def _pack(strings: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack(blob: np.ndarray, offsets: np.ndarray) -> list[str]:
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+
+
+def export_vectors(chroma_client, out_dir: str, user_id: str, file_id: str | None = None,
+                   page_size: int = 10000, compress: bool = False) -> dict:
+    """Writes every chunk of a user (or of one of their files) to out_dir."""
+    from .providers import get_embedding_provider
+    from .services.chroma_ops import get_chunk_ids, get_chunks_by_ids
+
+    where = {"user_id": user_id}
+    if file_id is not None:
+        where = {"$and": [{"file_id": file_id}, {"user_id": user_id}]}
+
+    os.makedirs(out_dir, exist_ok=True)
+    save = np.savez_compressed if compress else np.savez
+
+    provider = get_embedding_provider()
+    count = parts = 0
+    file_ids = set()
+
+    # Page over a sorted id snapshot: offset paging rescans from the start
+    # on every page, id lookups cost the same for every page
+    all_ids = get_chunk_ids(chroma_client, where)
+
+    for start in range(0, len(all_ids), page_size):
+        page = get_chunks_by_ids(chroma_client, all_ids[start:start + page_size])
+        if not page["ids"]:
+            # Deleted since the snapshot
+            continue
+
+        ids_blob, ids_offsets = _pack(page["ids"])
+        docs_blob, docs_offsets = _pack(page["documents"])
+        meta_blob, meta_offsets = _pack([json.dumps(m) for m in page["metadatas"]])
+        file_ids.update(m["file_id"] for m in page["metadatas"])
+
+        save(
+            os.path.join(out_dir, f"part-{parts:05d}.npz"),
+            embeddings=np.asarray(page["embeddings"], dtype=np.float32),
+            ids=ids_blob, ids_offsets=ids_offsets,
+            documents=docs_blob, documents_offsets=docs_offsets,
+            metadatas=meta_blob, metadatas_offsets=meta_offsets,
+        )
+
+        count += len(page["ids"])
+        parts += 1
+        logger.info("Exported %d/%d chunks.", count, len(all_ids))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "embedding_model": provider.model_id,
+        "dimension": provider.dimension,
+        "user_id": user_id,
+        "file_id": file_id,
+        "files": len(file_ids),
+        "chunks": count,
+        "parts": parts,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def import_vectors(chroma_client, in_dir: str, user_id: str | None = None, batch_size: int = 5000) -> dict:
+    """
+    Upserts an export into the active collection; no embedding calls.
+    Importing the same export twice is idempotent. Chunk ids are kept,
+    unless the chunks are given to another user: their ids are then
+    derived from the new user_id, so the source tenant's chunks are never
+    overwritten. Refuses to upsert over chunks owned by another user.
+    """
+    from .providers import get_embedding_provider
+    from .services.chroma_ops import add_embeddings, get_chunk_owners
+
+    with open(os.path.join(in_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    if manifest["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported export format version {manifest['format_version']}.")
+
+    model_id = get_embedding_provider().model_id
+    if manifest["embedding_model"] != model_id:
+        raise ValueError(
+            f"Export holds {manifest['embedding_model']} embeddings, "
+            f"but the active embedding model is {model_id}."
+        )
+
+    batch_size = min(batch_size, chroma_client.get_max_batch_size())
+    count = 0
+
+    for part in range(manifest["parts"]):
+        with np.load(os.path.join(in_dir, f"part-{part:05d}.npz")) as data:
+            embeddings = data["embeddings"]
+            ids = _unpack(data["ids"], data["ids_offsets"])
+            documents = _unpack(data["documents"], data["documents_offsets"])
+            metadatas = [json.loads(m) for m in _unpack(data["metadatas"], data["metadatas_offsets"])]
+
+        if user_id is not None and user_id != manifest["user_id"]:
+            ids = [str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{user_id}:{cid}")) for cid in ids]
+            for meta in metadatas:
+                meta["user_id"] = user_id
+
+        owners = get_chunk_owners(chroma_client, ids)
+        for cid, meta in zip(ids, metadatas):
+            if cid in owners and owners[cid] != meta["user_id"]:
+                raise ValueError(
+                    f"Chunk {cid} already exists for another user; "
+                    f"import with --user-id to give the chunks new ids."
+                )
+
+        for i in range(0, len(ids), batch_size):
+            end = i + batch_size
+            add_embeddings(chroma_client, documents[i:end], embeddings[i:end], ids[i:end], metadatas[i:end])
+
+        count += len(ids)
+        logger.info("Imported %d/%d chunks.", count, manifest["chunks"])
+
+    return {**manifest, "imported": count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="dump a user's or file's chunks and vectors")
+    export.add_argument("out_dir")
+    export.add_argument("--user-id", required=True)
+    export.add_argument("--file-id")
+    export.add_argument("--page-size", type=int, default=10000, help="chunks per part file")
+    export.add_argument("--compress", action="store_true", help="zip-compress part files (smaller, slower)")
+
+    load = commands.add_parser("import", help="load an export without re-embedding")
+    load.add_argument("in_dir")
+    load.add_argument("--user-id", help="assign the imported chunks to this user")
+    load.add_argument("--batch-size", type=int, default=5000, help="max records per Chroma add")
+
+    args = parser.parse_args()
+    configure_logging(settings.LOG_LEVEL, json_logs=False)
+
+    from .database.connection import create_chroma_client
+
+    chroma_client = create_chroma_client()
+    start = time.perf_counter()
+
+    if args.command == "export":
+        result = export_vectors(chroma_client, args.out_dir, args.user_id, args.file_id, args.page_size, args.compress)
+        count = result["chunks"]
+    else:
+        result = import_vectors(chroma_client, args.in_dir, args.user_id, args.batch_size)
+        count = result["imported"]
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{args.command}ed {count} vectors ({result['files']} files, {result['parts']} parts) "
+        f"in {elapsed:.1f}s: {count / elapsed * 60 if elapsed else 0:,.0f} vectors/min"
+    )
+
+
+if __name__ == "__main__":
+    main()
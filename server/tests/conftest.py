@@ -0,0 +1,31 @@
+"""
+Unit tests. Run from server/:
+    python -m pytest -q
+
+Settings are filled with the benchmark dummies so `src` imports without
+a .env, and Gemini is replaced by the in-process fake (no network).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks._common import setup_env  # noqa: E402
+
+setup_env()
+
+
+@pytest.fixture
+def fake_gemini():
+    from benchmarks.fake_gemini import install_fake_gemini
+
+    return install_fake_gemini(latency_ms=0, jitter_ms=0)
+
+
+@pytest.fixture
+def chroma(tmp_path):
+    import chromadb
+
+    return chromadb.PersistentClient(path=str(tmp_path / "chroma"))
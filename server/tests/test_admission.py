@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.services.admission import AdmissionController, AdmissionRejected, WorkPool
+
+
+def controller(**pools):
+    return AdmissionController([WorkPool(name, *config) for name, config in pools.items()])
+
+
+def test_runs_work_and_releases_the_slot():
+    async def main():
+        admission = controller(query=(1, 4, 1.0))
+        assert await admission.run("query", lambda a, b: a + b, 2, 3) == 5
+        with pytest.raises(ZeroDivisionError):
+            await admission.run("query", lambda: 1 / 0)
+        await asyncio.sleep(0)
+        return admission.stats()["query"]
+
+    stats = asyncio.run(main())
+    assert stats["running"] == 0
+    assert stats["admitted"] == 2
+
+
+def test_full_queue_rejects():
+    async def main():
+        admission = controller(query=(1, 1, 5.0))
+        release = threading.Event()
+        running = asyncio.create_task(admission.run("query", release.wait))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(admission.run("query", lambda: None))
+        await asyncio.sleep(0.05)
+
+        try:
+            with pytest.raises(AdmissionRejected):
+                await admission.run("query", lambda: None)
+        finally:
+            release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_thread_ends():
+    async def main():
+        admission = controller(query=(1, 4, 5.0))
+        release = threading.Event()
+
+        task = asyncio.create_task(admission.run("query", release.wait))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+
+        waiter = asyncio.create_task(admission.run("query", lambda: "next"))
+        await asyncio.sleep(0.05)
+        try:
+            # The thread is still busy, so the slot is still taken
+            assert admission.stats()["query"]["running"] == 1
+            assert not waiter.done()
+        finally:
+            release.set()
+
+        assert await waiter == "next"
+
+    asyncio.run(main())
+
+
+def test_higher_priority_work_goes_first():
+    async def main():
+        admission = controller(query=(1, 8, 5.0), ingest=(1, 8, 5.0))
+        order = []
+        release = threading.Event()
+
+        blocker = asyncio.create_task(admission.run("query", release.wait))
+        await asyncio.sleep(0.05)
+        query = asyncio.create_task(admission.run("query", lambda: order.append("query")))
+        await asyncio.sleep(0.05)
+        ingest = asyncio.create_task(admission.run("ingest", lambda: order.append("ingest")))
+        await asyncio.sleep(0.05)
+
+        try:
+            # ingest has a free slot of its own but waits for the queued query
+            assert order == []
+        finally:
+            release.set()
+        await asyncio.gather(blocker, ingest, query)
+        return order
+
+    assert asyncio.run(main()) == ["query", "ingest"]
@@ -0,0 +1,68 @@
+import pytest
+
+from src.core.config import settings
+from src.services.answer_router import choose_tier, select_relevant
+
+DOCS = ["a", "b", "c", "d"]
+METAS = [{"page_number": i} for i in range(4)]
+DISTANCES = [0.20, 0.25, 0.40, 0.70]
+
+
+@pytest.fixture
+def thresholds(monkeypatch):
+    def set_(**values):
+        for key, value in values.items():
+            monkeypatch.setattr(settings, key, value)
+    set_(RELEVANCE_MAX_DISTANCE=None, RELEVANCE_MAX_GAP=None, LLM_MODEL_FAST=None)
+    return set_
+
+
+def test_keeps_everything_without_thresholds(thresholds):
+    assert select_relevant(DOCS, METAS, DISTANCES) == (DOCS, METAS, DISTANCES)
+
+
+def test_keeps_everything_without_distances(thresholds):
+    thresholds(RELEVANCE_MAX_DISTANCE=0.1)
+    assert select_relevant(DOCS, METAS, None) == (DOCS, METAS, [])
+
+
+def test_absolute_cutoff(thresholds):
+    thresholds(RELEVANCE_MAX_DISTANCE=0.5)
+    docs, metas, distances = select_relevant(DOCS, METAS, DISTANCES)
+    assert docs == ["a", "b", "c"]
+    assert metas == METAS[:3]
+    assert distances == DISTANCES[:3]
+
+
+def test_gap_to_best_match(thresholds):
+    thresholds(RELEVANCE_MAX_GAP=0.1)
+    assert select_relevant(DOCS, METAS, DISTANCES)[0] == ["a", "b"]
+
+
+def test_both_thresholds_apply(thresholds):
+    thresholds(RELEVANCE_MAX_DISTANCE=0.22, RELEVANCE_MAX_GAP=0.3)
+    assert select_relevant(DOCS, METAS, DISTANCES)[0] == ["a"]
+
+
+def test_nothing_relevant(thresholds):
+    thresholds(RELEVANCE_MAX_DISTANCE=0.1)
+    assert select_relevant(DOCS, METAS, DISTANCES) == ([], [], [])
+
+
+def test_default_tier_without_fast_model(thresholds):
+    assert choose_tier("short", [0.01]) == "default"
+
+
+def test_fast_tier_for_short_close_context(thresholds):
+    thresholds(LLM_MODEL_FAST="fast-model", LLM_FAST_MAX_DISTANCE=0.3, LLM_FAST_MAX_CONTEXT_TOKENS=100)
+    assert choose_tier("x" * 40, [0.2, 0.5]) == "fast"
+
+
+def test_default_tier_for_weak_best_match(thresholds):
+    thresholds(LLM_MODEL_FAST="fast-model", LLM_FAST_MAX_DISTANCE=0.3, LLM_FAST_MAX_CONTEXT_TOKENS=100)
+    assert choose_tier("x" * 40, [0.35]) == "default"
+
+
+def test_default_tier_for_long_context(thresholds):
+    thresholds(LLM_MODEL_FAST="fast-model", LLM_FAST_MAX_DISTANCE=0.3, LLM_FAST_MAX_CONTEXT_TOKENS=100)
+    assert choose_tier("x" * 4 * 101, [0.1]) == "default"
@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+from src import bulk_ingest
+from src.bulk_ingest import BulkIngester, Journal
+from src.services.chroma_ops import add_embeddings, get_file_chunks
+from src.utils import embedder
+
+
+def prepared(name, texts, file_id=None):
+    """What prepare_file sends back for a PDF with one page per text."""
+    file_id = file_id or f"file-{name}"
+    return {
+        "path": f"/pdfs/{name}.pdf",
+        "file_id": file_id,
+        "pages": [{"page_number": n, "page_hash": f"{file_id}-{n}"} for n in range(1, len(texts) + 1)],
+        "chunks": [
+            {"chunk_id": f"{file_id}-{n}", "page_number": n, "text": text, "token_count": len(text) // 4}
+            for n, text in enumerate(texts, start=1)
+        ],
+    }
+
+
+@pytest.fixture
+def ingester(chroma, fake_gemini, tmp_path):
+    journal = Journal(str(tmp_path / "journal.jsonl"))
+    yield BulkIngester("u", chroma, journal, embed_workers=2, chroma_batch=100)
+    journal.close()
+
+
+def stored_ids(chroma, file_id):
+    return set(get_file_chunks(chroma, file_id, "u")["ids"])
+
+
+def journal_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_journal_keeps_the_last_record_per_path(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path)
+    journal.write(path="a.pdf", file_id="A", status="storing")
+    journal.write(path="a.pdf", file_id="A", status="done")
+    journal.write(path="b.pdf", file_id="B", status="storing")
+    journal.write(path="c.pdf", file_id="C", status="failed", error="boom")
+    journal.close()
+
+    reopened = Journal(path)
+    reopened.close()
+
+    assert reopened.done_file_ids() == {"A"}
+    assert reopened.interrupted_file_ids() == {"B"}
+    assert reopened.by_path["c.pdf"]["error"] == "boom"
+
+
+def test_store_embeds_several_files_together(chroma, ingester):
+    ingester.store([prepared("a", ["alpha one", "alpha two"]), prepared("b", ["beta one"])])
+
+    assert stored_ids(chroma, "file-a") == {"file-a-1", "file-a-2"}
+    assert stored_ids(chroma, "file-b") == {"file-b-1"}
+    assert ingester.stats["files"] == 2
+    assert ingester.stats["chunks"] == 3
+    assert ingester.stats["embed_calls"] == 1
+    assert ingester.journal.done_file_ids() == {"file-a", "file-b"}
+
+
+def test_duplicate_content_is_stored_once(chroma, ingester):
+    ingester.store([prepared("a", ["alpha"]), prepared("copy-of-a", ["alpha"], file_id="file-a")])
+    ingester.store([prepared("a-again", ["alpha"], file_id="file-a")])
+
+    assert ingester.stats["files"] == 1
+    assert ingester.stats["skipped"] == 2
+    assert ingester.journal.by_path["/pdfs/copy-of-a.pdf"]["duplicate"] is True
+
+
+def test_failing_file_is_isolated_from_its_batch(chroma, ingester, monkeypatch):
+    embed_chunks = embedder.embed_chunks
+
+    def poisoned(texts):
+        if any("poison" in t for t in texts):
+            raise RuntimeError("upstream rejected the input")
+        return embed_chunks(texts)
+
+    monkeypatch.setattr(embedder, "embed_chunks", poisoned)
+
+    ingester.store([
+        prepared("a", ["alpha one", "alpha two"]),
+        prepared("bad", ["poison"]),
+        prepared("b", ["beta one"]),
+    ])
+
+    assert stored_ids(chroma, "file-a") == {"file-a-1", "file-a-2"}
+    assert stored_ids(chroma, "file-b") == {"file-b-1"}
+    assert stored_ids(chroma, "file-bad") == set()
+    assert ingester.stats["files"] == 2
+    assert ingester.stats["failed"] == 1
+
+    last = {r["path"]: r for r in journal_records(ingester.journal.path)}
+    assert last["/pdfs/bad.pdf"]["status"] == "failed"
+    assert "upstream rejected the input" in last["/pdfs/bad.pdf"]["error"]
+    assert last["/pdfs/a.pdf"]["status"] == last["/pdfs/b.pdf"]["status"] == "done"
+
+
+def test_resume_cleans_up_an_interrupted_file(chroma, fake_gemini, tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    item = prepared("a", ["alpha one", "alpha two"])
+
+    # A previous run died after writing part of the file
+    journal = Journal(path)
+    journal.write(path=item["path"], file_id=item["file_id"], status="storing")
+    journal.close()
+    add_embeddings(
+        chroma, ["leftover"], embedder.embed_chunks(["leftover"]), ["file-a-leftover"],
+        [{"file_id": "file-a", "user_id": "u", "chunk_id": "file-a-leftover", "page_number": 9, "page_hash": "x"}],
+    )
+
+    journal = Journal(path)
+    ingester = BulkIngester("u", chroma, journal, embed_workers=1, chroma_batch=100)
+    assert ingester.interrupted == {"file-a"}
+    ingester.store([item])
+    journal.close()
+
+    assert stored_ids(chroma, "file-a") == {"file-a-1", "file-a-2"}
+    assert journal.done_file_ids() == {"file-a"}
+
+
+def test_file_ids_follow_content_and_user(tmp_path):
+    first, second = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    first.write_bytes(b"%PDF same bytes")
+    second.write_bytes(b"%PDF same bytes")
+
+    assert bulk_ingest.file_id_for("u", str(first)) == bulk_ingest.file_id_for("u", str(second))
+    assert bulk_ingest.file_id_for("u", str(first)) != bulk_ingest.file_id_for("v", str(first))
@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from src.utils.embed_batcher import EmbeddingBatcher
+
+
+class RecordingCall:
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def __call__(self, task_type, texts):
+        with self._lock:
+            self.calls.append((task_type, list(texts)))
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return [f"{task_type}:{t}" for t in texts]
+
+
+def run_concurrently(batcher, requests):
+    results, errors = {}, {}
+    start = threading.Barrier(len(requests))
+
+    def worker(i, task_type, texts):
+        start.wait()
+        try:
+            results[i] = batcher.embed(task_type, texts)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i, *r)) for i, r in enumerate(requests)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_requests_share_one_call():
+    call = RecordingCall()
+    batcher = EmbeddingBatcher(call, max_batch=100, window=0.2)
+
+    requests = [("RETRIEVAL_QUERY", [f"q{i}"]) for i in range(8)]
+    results, errors = run_concurrently(batcher, requests)
+
+    assert not errors
+    assert len(call.calls) == 1
+    # Every caller gets back exactly its own vectors
+    assert results == {i: [f"RETRIEVAL_QUERY:q{i}"] for i in range(8)}
+
+
+def test_task_types_are_not_mixed():
+    call = RecordingCall()
+    batcher = EmbeddingBatcher(call, max_batch=100, window=0.2)
+
+    results, _ = run_concurrently(batcher, [("RETRIEVAL_QUERY", ["a"]), ("RETRIEVAL_DOCUMENT", ["b"])])
+
+    assert sorted(task for task, _ in call.calls) == ["RETRIEVAL_DOCUMENT", "RETRIEVAL_QUERY"]
+    assert results == {0: ["RETRIEVAL_QUERY:a"], 1: ["RETRIEVAL_DOCUMENT:b"]}
+
+
+def test_batches_never_exceed_max_batch():
+    call = RecordingCall()
+    batcher = EmbeddingBatcher(call, max_batch=4, window=0.2)
+
+    results, errors = run_concurrently(batcher, [("RETRIEVAL_QUERY", [f"{i}a", f"{i}b"]) for i in range(5)])
+
+    assert not errors
+    assert all(len(texts) <= 4 for _, texts in call.calls)
+    assert sum(len(texts) for _, texts in call.calls) == 10
+    assert results[3] == ["RETRIEVAL_QUERY:3a", "RETRIEVAL_QUERY:3b"]
+
+
+def test_full_requests_skip_the_window():
+    call = RecordingCall()
+    batcher = EmbeddingBatcher(call, max_batch=2, window=10)
+
+    assert batcher.embed("RETRIEVAL_DOCUMENT", ["a", "b", "c"]) == [
+        "RETRIEVAL_DOCUMENT:a", "RETRIEVAL_DOCUMENT:b", "RETRIEVAL_DOCUMENT:c"
+    ]
+    assert len(call.calls) == 1
+
+
+def test_errors_reach_every_caller():
+    batcher = EmbeddingBatcher(RecordingCall(fail=True), max_batch=100, window=0.2)
+
+    results, errors = run_concurrently(batcher, [("RETRIEVAL_QUERY", [str(i)]) for i in range(3)])
+
+    assert not results
+    assert len(errors) == 3
+    assert all(isinstance(e, RuntimeError) for e in errors.values())
+
+
+def test_empty_request():
+    call = RecordingCall()
+    assert EmbeddingBatcher(call, max_batch=10, window=0.1).embed("RETRIEVAL_QUERY", []) == []
+    assert not call.calls
@@ -0,0 +1,132 @@
+import time
+
+import numpy as np
+
+from src.services.chroma_ops import (
+    add_embeddings,
+    delete_file_chunks,
+    get_file_revision,
+    touch_file_revision,
+    update_chunk_metadatas,
+)
+from src.services.embedding_cache import EmbeddingMatrixCache, FileMatrix
+
+
+def store(chroma, file_id, n, user_id="u"):
+    vectors = np.eye(n, 1536, dtype=np.float32) + 0.01
+    add_embeddings(
+        chroma, [f"{file_id} {i}" for i in range(n)], vectors, [f"{file_id}-{i}" for i in range(n)],
+        [{"file_id": file_id, "user_id": user_id, "page_number": i} for i in range(n)],
+    )
+
+
+def test_exact_search_ranks_by_cosine_distance():
+    matrix = FileMatrix(
+        ["a", "b", "c"], [[1, 0], [0.6, 0.8], [0, 1]], ["da", "db", "dc"], [{"i": 0}, {"i": 1}, {"i": 2}]
+    )
+
+    result = matrix.search([[0, 2], [1, 0.1]], top_k=2)
+
+    assert result["ids"] == [["c", "b"], ["a", "b"]]
+    assert result["documents"][0] == ["dc", "db"]
+    np.testing.assert_allclose(result["distances"][0], [0.0, 0.2], atol=1e-6)
+
+
+def test_hits_and_user_isolation(chroma):
+    store(chroma, "f1", 4)
+    cache = EmbeddingMatrixCache(1 << 30, 100)
+
+    matrix = cache.get(chroma, "u", "f1")
+    assert len(matrix.ids) == 4
+    assert cache.get(chroma, "u", "f1") is matrix
+    assert cache.get(chroma, "someone-else", "f1") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalidate_reloads(chroma):
+    store(chroma, "f1", 4)
+    cache = EmbeddingMatrixCache(1 << 30, 100)
+    first = cache.get(chroma, "u", "f1")
+
+    cache.invalidate("u", "f1")
+
+    assert cache.get(chroma, "u", "f1") is not first
+
+
+def test_changes_by_others_are_seen_after_revalidation(chroma):
+    store(chroma, "f1", 4)
+    cache = EmbeddingMatrixCache(1 << 30, 100, revalidate_after=0.05)
+    first = cache.get(chroma, "u", "f1")
+
+    # Another worker moves a page (as _update_pdf does): no local invalidation
+    update_chunk_metadatas(chroma, ["f1-0"], [{"page_number": 9}])
+    touch_file_revision(chroma, "f1", "u")
+    assert cache.get(chroma, "u", "f1") is first
+
+    time.sleep(0.06)
+    reloaded = cache.get(chroma, "u", "f1")
+    assert reloaded is not first
+    assert {m["page_number"] for m in reloaded.metadatas} == {9, 1, 2, 3}
+
+    delete_file_chunks("f1", chroma, user_id="u")
+    time.sleep(0.06)
+    assert cache.get(chroma, "u", "f1") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_byte_budget_evicts_least_recently_used(chroma):
+    for file_id in ("f1", "f2", "f3"):
+        store(chroma, file_id, 4)
+    one_file = FileMatrix(["x"] * 4, np.zeros((4, 1536)), ["f1 0"] * 4, [{}] * 4).nbytes
+    cache = EmbeddingMatrixCache(int(one_file * 2.5), 100)
+
+    for file_id in ("f1", "f2", "f3"):
+        cache.get(chroma, "u", file_id)
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= cache.max_bytes
+
+
+def test_oversized_files_are_bounded(chroma):
+    for file_id in ("f1", "f2", "f3"):
+        store(chroma, file_id, 5)
+    cache = EmbeddingMatrixCache(1 << 30, max_chunks=4, max_oversized=2)
+
+    for file_id in ("f1", "f2", "f3"):
+        assert cache.get(chroma, "u", file_id) is None
+
+    assert cache.stats()["oversized_files"] == 2
+
+
+def test_revalidation_is_one_lookup_by_id(chroma, monkeypatch):
+    from src.services import embedding_cache as module
+
+    store(chroma, "f1", 4)
+    cache = EmbeddingMatrixCache(1 << 30, 100, revalidate_after=0)
+    first = cache.get(chroma, "u", "f1")
+
+    loads = []
+    monkeypatch.setattr(module, "get_file_embeddings", lambda *args, **kwargs: loads.append(args))
+    assert cache.get(chroma, "u", "f1") is first
+    assert loads == []
+
+
+def test_writes_bump_the_revision_and_deletes_drop_it(chroma):
+    store(chroma, "f1", 2)
+    first = get_file_revision(chroma, "f1", "u")
+
+    store(chroma, "f1", 3)
+    assert get_file_revision(chroma, "f1", "u") not in (None, first)
+    assert get_file_revision(chroma, "f1", "someone-else") is None
+
+    delete_file_chunks("f1", chroma, user_id="u")
+    assert get_file_revision(chroma, "f1", "u") is None
+
+
+def test_unknown_files_leave_no_marker(chroma):
+    cache = EmbeddingMatrixCache(1 << 30, 100)
+
+    assert cache.get(chroma, "u", "missing") is None
+    assert get_file_revision(chroma, "missing", "u") is None
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+tokenizers = pytest.importorskip("tokenizers")
+
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+from src.providers.onnx_local import OnnxEmbeddingProvider  # noqa: E402
+
+WORDS = [f"w{i}" for i in range(50)]
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    vocab = {"[PAD]": 0, "[UNK]": 1, **{w: i + 2 for i, w in enumerate(WORDS)}}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+
+    # Token embedding lookup: (batch, seq) ids -> (batch, seq, 8)
+    table = numpy_helper.from_array(np.random.default_rng(0).random((len(vocab), 8), dtype=np.float32), "table")
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["hidden"])],
+        "embed",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, [None, None]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, [None, None]),
+        ],
+        [helper.make_tensor_value_info("hidden", TensorProto.FLOAT, [None, None, 8])],
+        [table],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(tmp_path / "model.onnx"))
+    return str(tmp_path)
+
+
+def test_count_tokens_is_not_capped_by_truncation(model_dir):
+    provider = OnnxEmbeddingProvider(model_dir, threads=1, max_length=16)
+    text = " ".join(WORDS[i % len(WORDS)] for i in range(40))
+
+    assert provider.max_input_tokens == 16
+    assert provider.count_tokens(text) == 40
+    # Embedding still truncates to the model's window
+    assert len(provider.embed_query(text)) == provider.dimension == 8
+
+
+def test_chunks_are_capped_at_the_model_input_limit(model_dir, monkeypatch):
+    from src.services import rag_service
+
+    provider = OnnxEmbeddingProvider(model_dir, threads=1, max_length=16)
+    monkeypatch.setattr(rag_service, "get_embedding_provider", lambda: provider)
+    monkeypatch.setattr(rag_service.settings, "CHUNK_MAX_TOKENS", 800)
+
+    assert rag_service.chunk_max_tokens() == 16
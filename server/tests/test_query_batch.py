@@ -0,0 +1,95 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core.security import get_current_user
+from src.database.connection import get_chroma_client_instance
+from src.rate_limiting import compute_cost, enforce_quota
+from src.routers import query
+from src.services.rag_service import RAG_PIPLINE
+from src.utils.generate_hash import fingerprint_text
+
+TEXTS = [
+    "The policy covers water damage to the insured building.",
+    "Claims must be filed within thirty days of the incident.",
+    "The deductible is two hundred euros per claim.",
+]
+QUESTIONS = ["What damage is covered?", "When must claims be filed?", "How much is the deductible?"]
+
+
+@pytest.fixture
+def file_id(chroma, fake_gemini, monkeypatch):
+    service = RAG_PIPLINE("u", chroma)
+    pages = [
+        {"page_number": n, "text": text, "page_hash": fingerprint_text(text)}
+        for n, text in enumerate(TEXTS, start=1)
+    ]
+    monkeypatch.setattr(service, "_extract_pages", lambda file_bytes, filename, file_id: pages)
+    return service._process_pdf(b"", "policy.pdf")["file_id"]
+
+
+@pytest.fixture
+def charges(monkeypatch):
+    charged = []
+    monkeypatch.setattr(query, "charge_quota", lambda user_id, cost, response=None: charged.append((user_id, cost)))
+    return charged
+
+
+def batch_app(chroma):
+    app = FastAPI()
+    app.include_router(query.router)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="u")
+    app.dependency_overrides[get_chroma_client_instance] = lambda: chroma
+    app.dependency_overrides[enforce_quota] = lambda: "u"
+    return app
+
+
+def test_batch_streams_one_line_per_question_and_a_summary(chroma, file_id, charges):
+    with TestClient(batch_app(chroma)) as client:
+        response = client.post("/query/batch", json={"file_id": file_id, "questions": QUESTIONS, "top_k": 2})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    answers, summary = lines[:-1], lines[-1]
+    assert sorted(a["index"] for a in answers) == [0, 1, 2]
+    assert all(a["question"] == QUESTIONS[a["index"]] and a["answer"] for a in answers)
+    assert summary == {"done": True, "answered": 3, "errors": 0, "embed_calls": 1}
+
+    tokens = sum(a["usage"]["prompt_tokens"] + a["usage"]["output_tokens"] for a in answers)
+    assert charges == [("u", compute_cost(embed_calls=1, tokens=tokens))]
+
+
+def test_unknown_file_is_404(chroma, fake_gemini, charges):
+    with TestClient(batch_app(chroma)) as client:
+        response = client.post("/query/batch", json={"file_id": "missing", "questions": QUESTIONS})
+
+    assert response.status_code == 404
+    assert charges == []
+
+
+def test_client_leaving_early_still_pays_for_retrieval(chroma, file_id, charges, fake_gemini):
+    async def main():
+        response = await query.query_pdf_batch(
+            payload=query.BatchQueryRequest(file_id=file_id, questions=QUESTIONS * 4, concurrency=1),
+            current_user=SimpleNamespace(id="u"),
+            chroma_client=chroma,
+            quota_user_id="u",
+        )
+        first = json.loads(await response.body_iterator.__anext__())
+        await response.body_iterator.aclose()
+        # Let cancelled questions settle before counting upstream calls
+        await asyncio.sleep(0.1)
+        return first
+
+    first = asyncio.run(main())
+
+    tokens = first["usage"]["prompt_tokens"] + first["usage"]["output_tokens"]
+    assert charges == [("u", compute_cost(embed_calls=1, tokens=tokens))]
+    # Questions still waiting for their turn were cancelled, not generated
+    assert fake_gemini.models.calls["generate_content"] < len(QUESTIONS) * 4
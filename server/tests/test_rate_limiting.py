@@ -0,0 +1,84 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from limits import parse
+
+from src import rate_limiting
+from src.core.security import get_current_user
+from src.rate_limiting import charge_quota, compute_cost, enforce_quota
+
+
+@pytest.fixture(autouse=True)
+def quota(monkeypatch):
+    monkeypatch.setattr(rate_limiting, "quota_item", parse("100/hour"))
+    rate_limiting.quota_storage.reset()
+    yield
+    rate_limiting.quota_storage.reset()
+
+
+def remaining(user_id):
+    return rate_limiting.quota_limiter.get_window_stats(rate_limiting.quota_item, "cost", user_id).remaining
+
+
+def test_cost_weights_pages_embed_calls_and_tokens():
+    # 2 pages * 10 + 3 embed calls * 5 + 1500 tokens * 10 / 1000
+    assert compute_cost(pages=2, embed_calls=3, tokens=1500) == 50
+    # Every request costs at least one unit
+    assert compute_cost() == 1
+
+
+def test_overshooting_request_drains_the_budget():
+    charge_quota("u1", 60)
+    assert remaining("u1") == 40
+
+    # Costs more than is left: the work is done, so the rest is used up
+    charge_quota("u1", 70)
+    assert remaining("u1") == 0
+    assert remaining("u2") == 100
+
+
+def test_exhausted_quota_is_rejected_with_429():
+    charge_quota("u1", 100)
+
+    with pytest.raises(HTTPException) as error:
+        enforce_quota(SimpleNamespace(id="u1"))
+
+    assert error.value.status_code == 429
+    assert error.value.headers["X-Quota-Remaining"] == "0"
+    assert int(error.value.headers["Retry-After"]) >= 1
+    assert enforce_quota(SimpleNamespace(id="u2")) == "u2"
+
+
+def test_route_checks_the_quota_off_the_event_loop(monkeypatch):
+    threads = {}
+
+    def current_user():
+        return SimpleNamespace(id="u1")
+
+    app = FastAPI()
+    app.dependency_overrides[get_current_user] = current_user
+
+    @app.get("/work")
+    async def work(user_id: str = Depends(enforce_quota)):
+        threads["loop"] = threading.current_thread()
+        return {"user_id": user_id}
+
+    original_test = rate_limiting.quota_limiter.test
+
+    def test(*args):
+        threads["quota"] = threading.current_thread()
+        return original_test(*args)
+
+    monkeypatch.setattr(rate_limiting.quota_limiter, "test", test)
+
+    with TestClient(app) as client:
+        assert client.get("/work").json() == {"user_id": "u1"}
+        charge_quota("u1", 100)
+        response = client.get("/work")
+
+    assert response.status_code == 429
+    assert response.headers["X-Quota-Limit"] == "100"
+    assert threads["quota"] is not threads["loop"]
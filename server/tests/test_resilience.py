@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from src.providers.resilience import CircuitBreaker, CircuitOpen
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failures=3, recovery_seconds=60)
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened"] == 1
+
+    with pytest.raises(CircuitOpen) as exc:
+        breaker.before_call()
+    assert exc.value.retry_after >= 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("test", failures=2, recovery_seconds=60)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failures=1, recovery_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failures=5, recovery_seconds=0.01)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.02)
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
@@ -0,0 +1,53 @@
+import pytest
+
+from benchmarks.retrieval_tuning import rank_of_answer, recommend, score
+
+
+def row(search="hnsw", recall=0.9, mrr=0.8, p95=5.0, size=10.0, **setting):
+    return {
+        "search": search,
+        "recall_at_5": recall,
+        "mrr": mrr,
+        "query": {"p95_ms": p95},
+        "index_size_mb": size,
+        **setting,
+    }
+
+
+def test_rank_is_the_first_chunk_from_the_answer_page():
+    metadatas = [{"page_number": 3}, {"page_number": 7}, {"page_number": 7}]
+
+    assert rank_of_answer(metadatas, 7) == 2
+    assert rank_of_answer(metadatas, 1) is None
+
+
+def test_score_counts_recall_per_k_and_mrr():
+    result = score([1, 3, None, 2], [0.001, 0.002, 0.003, 0.004], [1, 3])
+
+    assert result["recall_at_1"] == 0.25
+    assert result["recall_at_3"] == 0.75
+    # (1 + 1/3 + 0 + 1/2) / 4
+    assert result["mrr"] == pytest.approx(11 / 24)
+    assert result["query"]["count"] == 4
+
+
+def test_recommend_prefers_recall_then_mrr():
+    rows = [
+        row(recall=0.80, mrr=0.80, name="low recall"),
+        row(recall=0.95, mrr=0.60, name="best recall"),
+        row(recall=0.945, mrr=0.70, name="tied recall, better mrr"),
+    ]
+
+    assert recommend(rows, target_k=5, tolerance=0.01)["name"] == "tied recall, better mrr"
+    assert recommend(rows, target_k=5, tolerance=0.0)["name"] == "best recall"
+
+
+def test_recommend_breaks_ties_on_latency_then_size_and_skips_exact_rows():
+    rows = [
+        row(search="exact", recall=1.0, mrr=1.0, p95=0.1, size=0.0, name="exact"),
+        row(p95=9.0, size=1.0, name="slow"),
+        row(p95=2.0, size=50.0, name="fast but large"),
+        row(p95=2.0, size=20.0, name="fast and small"),
+    ]
+
+    assert recommend(rows, target_k=5, tolerance=0.01)["name"] == "fast and small"
@@ -0,0 +1,133 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from bson import DBRef, ObjectId
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from src.core import security
+
+
+class _UserIdField:
+    """Stands in for RefreshToken.user.id in a find() expression."""
+
+    def __eq__(self, user_id):
+        return lambda doc: doc["user"].id == user_id
+
+
+class FakeTokenStore:
+    """The few Beanie calls security.py makes, kept in a dict by token_hash."""
+
+    def __init__(self):
+        self.docs = {}
+        store = self
+
+        class RefreshToken:
+            user = SimpleNamespace(id=_UserIdField())
+
+            def __init__(self, token_hash, user, expires_at, created_at):
+                self.doc = {"token_hash": token_hash, "user": DBRef("users", user.id)}
+
+            async def create(self):
+                store.docs[self.doc["token_hash"]] = self.doc
+
+            @staticmethod
+            def get_pymongo_collection():
+                return store
+
+            @staticmethod
+            def find(matches):
+                async def delete():
+                    for token_hash in [h for h, doc in store.docs.items() if matches(doc)]:
+                        del store.docs[token_hash]
+
+                return SimpleNamespace(delete=delete)
+
+        self.RefreshToken = RefreshToken
+
+    async def find_one_and_delete(self, query):
+        return self.docs.pop(query["token_hash"], None)
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    store = FakeTokenStore()
+    users = {}
+
+    async def get_user(user_id):
+        return users.get(str(user_id))
+
+    def add_user():
+        user = SimpleNamespace(id=ObjectId())
+        users[str(user.id)] = user
+        return user
+
+    monkeypatch.setattr(security, "RefreshToken", store.RefreshToken)
+    monkeypatch.setattr(security, "User", SimpleNamespace(get=get_user))
+    store.add_user = add_user
+    return store
+
+
+def test_rotation_replaces_the_token(tokens):
+    async def main():
+        user = tokens.add_user()
+        old = await security.create_refresh_token(user)
+        rotated_user, new = await security.rotate_refresh_token(old)
+        return user, old, rotated_user, new
+
+    user, old, rotated_user, new = asyncio.run(main())
+    assert rotated_user is user
+    assert new != old
+    assert set(tokens.docs) == {security.hash_token(new)}
+
+
+def test_reuse_revokes_every_token_of_the_user(tokens):
+    async def main():
+        user, other = tokens.add_user(), tokens.add_user()
+        old = await security.create_refresh_token(user)
+        await security.create_refresh_token(user)  # a second session
+        kept = await security.create_refresh_token(other)
+        await security.rotate_refresh_token(old)
+
+        with pytest.raises(HTTPException) as error:
+            await security.rotate_refresh_token(old)
+        return error.value, kept
+
+    error, kept = asyncio.run(main())
+    assert error.status_code == 401
+    # The rotated token and the other session are gone, other users keep theirs
+    assert set(tokens.docs) == {security.hash_token(kept)}
+
+
+def test_concurrent_rotation_lets_only_one_through(tokens):
+    async def main():
+        user = tokens.add_user()
+        old = await security.create_refresh_token(user)
+        return await asyncio.gather(
+            security.rotate_refresh_token(old),
+            security.rotate_refresh_token(old),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert sum(isinstance(r, HTTPException) for r in results) == 1
+    # The loser counts as reuse, so the winner's new token is revoked too
+    assert tokens.docs == {}
+
+
+def test_access_and_refresh_tokens_are_not_interchangeable(tokens):
+    async def main():
+        user = tokens.add_user()
+        refresh = await security.create_refresh_token(user)
+
+        with pytest.raises(HTTPException) as refresh_as_access:
+            await security.get_current_user(
+                HTTPAuthorizationCredentials(scheme="Bearer", credentials=refresh)
+            )
+        with pytest.raises(HTTPException) as access_as_refresh:
+            await security.rotate_refresh_token(security.create_access_token(str(user.id)))
+        return refresh_as_access.value, access_as_refresh.value
+
+    for error in asyncio.run(main()):
+        assert error.status_code == 401
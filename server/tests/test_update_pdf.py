@@ -0,0 +1,101 @@
+import pytest
+
+from src.services.chroma_ops import get_file_chunks
+from src.services.rag_service import RAG_PIPLINE
+from src.utils.generate_hash import fingerprint_text
+
+TEXTS = {
+    "intro": "Introduction. The policy covers water damage to the insured building.",
+    "terms": "Terms. Claims must be filed within thirty days of the incident.",
+    "fees": "Fees. The deductible is two hundred euros per claim.",
+    "annex": "Annex. Contact the claims office for assistance.",
+}
+
+
+def pages(*names):
+    return [
+        {"page_number": number, "text": TEXTS[name], "page_hash": fingerprint_text(TEXTS[name])}
+        for number, name in enumerate(names, start=1)
+    ]
+
+
+@pytest.fixture
+def pipeline(chroma, fake_gemini, monkeypatch):
+    service = RAG_PIPLINE("u", chroma)
+    revision = {}
+    # Feed pages directly instead of parsing a PDF
+    monkeypatch.setattr(service, "_extract_pages", lambda file_bytes, filename, file_id: revision["pages"])
+
+    def ingest(*names):
+        revision["pages"] = pages(*names)
+        return service._process_pdf(b"", "doc.pdf")["file_id"]
+
+    def update(file_id, *names):
+        revision["pages"] = pages(*names)
+        return service._update_pdf(file_id, b"", "doc.pdf")
+
+    return service, ingest, update
+
+
+def stored_pages(service, file_id):
+    stored = get_file_chunks(service.chroma, file_id, "u")
+    return {(m["page_number"], m["page_hash"]) for m in stored["metadatas"]}, set(stored["ids"])
+
+
+def test_unchanged_revision_embeds_nothing(pipeline):
+    service, ingest, update = pipeline
+    file_id = ingest("intro", "terms", "fees")
+    _, ids_before = stored_pages(service, file_id)
+
+    result = update(file_id, "intro", "terms", "fees")
+
+    assert result["unchanged_pages"] == 3
+    assert result["changed_pages"] == result["moved_pages"] == result["removed_pages"] == 0
+    assert result["embed_calls"] == 0
+    assert stored_pages(service, file_id)[1] == ids_before
+
+
+def test_changed_page_is_the_only_one_reembedded(pipeline):
+    service, ingest, update = pipeline
+    file_id = ingest("intro", "terms", "fees")
+
+    result = update(file_id, "intro", "annex", "fees")
+
+    assert result["unchanged_pages"] == 2
+    assert result["changed_pages"] == 1
+    assert result["embed_calls"] == 1
+    assert result["deleted_count"] >= 1
+    meta, _ = stored_pages(service, file_id)
+    assert meta == {(1, fingerprint_text(TEXTS["intro"])), (2, fingerprint_text(TEXTS["annex"])),
+                    (3, fingerprint_text(TEXTS["fees"]))}
+
+
+def test_moved_pages_keep_their_vectors(pipeline):
+    service, ingest, update = pipeline
+    file_id = ingest("intro", "terms", "fees")
+    _, ids_before = stored_pages(service, file_id)
+
+    result = update(file_id, "fees", "intro", "terms")
+
+    assert result["moved_pages"] == 3
+    assert result["embed_calls"] == 0
+    meta, ids_after = stored_pages(service, file_id)
+    assert ids_after == ids_before
+    assert (1, fingerprint_text(TEXTS["fees"])) in meta
+
+
+def test_removed_pages_are_deleted(pipeline):
+    service, ingest, update = pipeline
+    file_id = ingest("intro", "terms", "fees")
+
+    result = update(file_id, "intro", "terms")
+
+    assert result["removed_pages"] == 1
+    assert result["unchanged_pages"] == 2
+    assert {page for page, _ in stored_pages(service, file_id)[0]} == {1, 2}
+
+
+def test_unknown_file(pipeline):
+    _, _, update = pipeline
+    with pytest.raises(ValueError):
+        update("missing", "intro")
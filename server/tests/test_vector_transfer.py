@@ -0,0 +1,102 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.services.chroma_ops import add_embeddings, get_embedding_collection
+from src.vector_transfer import _pack, _unpack, export_vectors, import_vectors
+
+
+def store(chroma, user_id, file_id, n, prefix="c"):
+    rng = np.random.default_rng(n)
+    add_embeddings(
+        chroma,
+        [f"chunk {i} – ünïcode" for i in range(n)],
+        rng.random((n, 1536), dtype=np.float32),
+        [f"{prefix}{i}" for i in range(n)],
+        [{"file_id": file_id, "user_id": user_id, "page_number": i} for i in range(n)],
+    )
+
+
+def owned_by(chroma, user_id):
+    return get_embedding_collection(chroma).get(
+        where={"user_id": user_id}, include=["embeddings", "documents", "metadatas"]
+    )
+
+
+def test_pack_round_trip():
+    strings = ["", "plain", "ünïcode ✓", json.dumps({"a": 1})]
+    blob, offsets = _pack(strings)
+    assert blob.dtype == np.uint8
+    assert _unpack(blob, offsets) == strings
+
+
+def test_export_import_round_trip(chroma, tmp_path, fake_gemini, monkeypatch):
+    store(chroma, "alice", "f1", 7)
+    store(chroma, "alice", "f2", 5, prefix="d")
+    store(chroma, "bob", "f3", 3, prefix="e")
+    before = owned_by(chroma, "alice")
+
+    manifest = export_vectors(chroma, str(tmp_path / "export"), "alice", page_size=4)
+    assert manifest["chunks"] == 12
+    assert manifest["files"] == 2
+    assert manifest["parts"] == 3
+
+    for cid in before["ids"]:
+        get_embedding_collection(chroma).delete(ids=[cid])
+    assert import_vectors(chroma, str(tmp_path / "export"))["imported"] == 12
+
+    after = owned_by(chroma, "alice")
+    order = {cid: i for i, cid in enumerate(after["ids"])}
+    assert sorted(after["ids"]) == sorted(before["ids"])
+    for i, cid in enumerate(before["ids"]):
+        j = order[cid]
+        assert after["documents"][j] == before["documents"][i]
+        assert after["metadatas"][j] == before["metadatas"][i]
+        np.testing.assert_allclose(after["embeddings"][j], before["embeddings"][i], rtol=1e-6)
+
+
+def test_export_of_one_file(chroma, tmp_path, fake_gemini):
+    store(chroma, "alice", "f1", 4)
+    store(chroma, "alice", "f2", 2, prefix="d")
+
+    manifest = export_vectors(chroma, str(tmp_path / "export"), "alice", file_id="f2")
+
+    assert manifest["chunks"] == 2
+    assert manifest["files"] == 1
+
+
+def test_import_for_another_user_keeps_the_source(chroma, tmp_path, fake_gemini):
+    store(chroma, "alice", "f1", 6)
+    export_vectors(chroma, str(tmp_path / "export"), "alice")
+
+    import_vectors(chroma, str(tmp_path / "export"), user_id="carol")
+    # Idempotent: ids derive from the new user and the original ids
+    import_vectors(chroma, str(tmp_path / "export"), user_id="carol")
+
+    assert len(owned_by(chroma, "alice")["ids"]) == 6
+    carol = owned_by(chroma, "carol")
+    assert len(carol["ids"]) == 6
+    assert not set(carol["ids"]) & {f"c{i}" for i in range(6)}
+
+
+def test_import_refuses_chunks_of_another_owner(chroma, tmp_path, fake_gemini):
+    store(chroma, "alice", "f1", 3)
+    export_vectors(chroma, str(tmp_path / "export"), "alice")
+    get_embedding_collection(chroma).update(ids=["c0"], metadatas=[{"user_id": "mallory"}])
+
+    with pytest.raises(ValueError, match="another user"):
+        import_vectors(chroma, str(tmp_path / "export"))
+
+
+def test_import_refuses_other_embedding_model(chroma, tmp_path, fake_gemini):
+    store(chroma, "alice", "f1", 2)
+    export_vectors(chroma, str(tmp_path / "export"), "alice")
+
+    manifest_path = tmp_path / "export" / "manifest.json"
+    manifest = json.loads(manifest_path.read_text())
+    manifest["embedding_model"] = "onnx:other:384"
+    manifest_path.write_text(json.dumps(manifest))
+
+    with pytest.raises(ValueError, match="embedding model"):
+        import_vectors(chroma, str(tmp_path / "export"))